@@ -14,7 +14,7 @@ if PROJECT_ROOT not in sys.path:
 
 from app.infrastructure.db import Base  # type: ignore  # noqa: E402
 from app import models  # noqa: F401, E402 - ensure models are imported for autogenerate
-from app.config import settings  # type: ignore  # noqa: E402
+from app.config import get_settings  # type: ignore  # noqa: E402
 
 
 config = context.config
@@ -26,7 +26,7 @@ target_metadata = Base.metadata
 
 
 def run_migrations_offline() -> None:
-    url = settings.database_url
+    url = get_settings().database_url
     context.configure(
         url=url,
         target_metadata=target_metadata,
@@ -41,7 +41,7 @@ def run_migrations_offline() -> None:
 def run_migrations_online() -> None:
     configuration = config.get_section(config.config_ini_section)
     assert configuration is not None
-    configuration["sqlalchemy.url"] = settings.database_url
+    configuration["sqlalchemy.url"] = get_settings().database_url
 
     connectable = engine_from_config(
         configuration,
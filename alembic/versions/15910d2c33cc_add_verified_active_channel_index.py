@@ -0,0 +1,33 @@
+"""add the partial index on verified, active channels
+
+Revision ID: 15910d2c33cc
+Revises: b063d89b3286
+Create Date: 2026-10-15 13:00:00.000000
+
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '15910d2c33cc'
+down_revision = 'b063d89b3286'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_channel_user_verified_active", "channels", ["user_id"],
+            postgresql_where=sa.text("is_verified AND is_active"),
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_channel_user_verified_active", table_name="channels", postgresql_concurrently=True)
@@ -0,0 +1,64 @@
+"""make the channels (user_id, channel_id) index unique
+
+Revision ID: 1f2f10ed5d44
+Revises: a20e166e500f
+Create Date: 2026-10-15 12:10:00.000000
+
+Channel verification upserts with ON CONFLICT (user_id, channel_id), which
+needs ix_user_channel to be unique. The unique index is built concurrently
+under a temporary name and then swapped in, so channel reads and writes are
+not blocked while it builds.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1f2f10ed5d44'
+down_revision = 'a20e166e500f'
+branch_labels = None
+depends_on = None
+
+
+_DUPLICATE_CHANNELS = (
+    "SELECT id, min(id) OVER (PARTITION BY user_id, channel_id) AS keep_id FROM channels"
+)
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    existing = {ix["name"]: ix for ix in inspector.get_indexes("channels")}.get("ix_user_channel")
+    if existing is not None and existing["unique"]:
+        return
+
+    # Move videos onto the oldest row of each duplicate (user_id, channel_id), then drop the rest
+    op.execute(
+        f"UPDATE videos SET channel_id = d.keep_id FROM ({_DUPLICATE_CHANNELS}) d "
+        "WHERE videos.channel_id = d.id AND d.id <> d.keep_id"
+    )
+    op.execute(
+        f"DELETE FROM channels USING ({_DUPLICATE_CHANNELS}) d "
+        "WHERE channels.id = d.id AND d.id <> d.keep_id"
+    )
+
+    # CREATE/DROP INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_channel_unique", "channels", ["user_id", "channel_id"],
+            unique=True, postgresql_concurrently=True,
+        )
+        if existing is not None:
+            op.drop_index("ix_user_channel", table_name="channels", postgresql_concurrently=True)
+        op.execute("ALTER INDEX ix_user_channel_unique RENAME TO ix_user_channel")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_user_channel_plain", "channels", ["user_id", "channel_id"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_user_channel", table_name="channels", postgresql_concurrently=True)
+        op.execute("ALTER INDEX ix_user_channel_plain RENAME TO ix_user_channel")
@@ -0,0 +1,100 @@
+"""use BIGINT identity keys and server-side timestamp defaults
+
+Revision ID: 5b1b2acb525b
+Revises: f993709a17a6
+Create Date: 2026-10-15 12:40:00.000000
+
+Widens the primary keys and the foreign keys pointing at them to BIGINT,
+turns the serial primary keys into GENERATED ALWAYS identity columns that
+continue after the current maximum id, and moves the timestamp defaults to
+the server. Each table rewrite takes an ACCESS EXCLUSIVE lock for its duration.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b1b2acb525b'
+down_revision = 'f993709a17a6'
+branch_labels = None
+depends_on = None
+
+
+_KEY_TABLES = ("users", "channels", "videos", "monthly_views")
+
+# (table, column, nullable)
+_FOREIGN_KEY_COLUMNS = (
+    ("channels", "user_id", False),
+    ("videos", "user_id", False),
+    ("videos", "channel_id", True),
+    ("monthly_views", "user_id", False),
+    ("monthly_views", "video_id", False),
+)
+
+_TIMESTAMP_COLUMNS = (
+    ("users", "created_at"),
+    ("channels", "created_at"),
+    ("videos", "last_updated_at"),
+    ("videos", "updated_at"),
+    ("videos", "created_at"),
+    ("monthly_views", "updated_at"),
+)
+
+
+def _is_identity(table: str) -> bool:
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT is_identity = 'YES' FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = 'id'"
+        ),
+        {"table": table},
+    ).scalar()
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    column_types = {
+        (table, c["name"]): c["type"]
+        for table in _KEY_TABLES
+        for c in inspector.get_columns(table)
+    }
+
+    # Referencing columns first, so each foreign key matches its widened key
+    for table, column, nullable in _FOREIGN_KEY_COLUMNS:
+        if not isinstance(column_types[(table, column)], sa.BigInteger):
+            op.alter_column(table, column, type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=nullable)
+
+    for table in _KEY_TABLES:
+        if not isinstance(column_types[(table, "id")], sa.BigInteger):
+            op.alter_column(table, "id", type_=sa.BigInteger(), existing_type=sa.Integer(), existing_nullable=False)
+        if _is_identity(table):
+            continue
+        sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+        op.alter_column(table, "id", server_default=None, existing_type=sa.BigInteger(), existing_nullable=False)
+        if sequence:
+            op.execute(f"DROP SEQUENCE {sequence}")
+        start = bind.execute(sa.text(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")).scalar()
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id ADD GENERATED ALWAYS AS IDENTITY (START WITH {start})")
+
+    for table, column in _TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=sa.func.now(), existing_type=sa.DateTime(), existing_nullable=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+
+    for table, column in _TIMESTAMP_COLUMNS:
+        op.alter_column(table, column, server_default=None, existing_type=sa.DateTime(), existing_nullable=False)
+
+    for table in _KEY_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+        op.alter_column(table, "id", type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=False)
+        start = bind.execute(sa.text(f"SELECT coalesce(max(id), 0) + 1 FROM {table}")).scalar()
+        op.execute(f"CREATE SEQUENCE {table}_id_seq AS integer START WITH {start} OWNED BY {table}.id")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{table}_id_seq')")
+
+    for table, column, nullable in _FOREIGN_KEY_COLUMNS:
+        op.alter_column(table, column, type_=sa.Integer(), existing_type=sa.BigInteger(), existing_nullable=nullable)
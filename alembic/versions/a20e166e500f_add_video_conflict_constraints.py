@@ -0,0 +1,53 @@
+"""add unique constraints used as ON CONFLICT targets
+
+Revision ID: a20e166e500f
+Revises:
+Create Date: 2026-10-15 12:00:00.000000
+
+Video sync inserts rely on uq_video_user_videoid and the monthly upsert on
+uq_video_year_month. Databases created by create_all before the constraints
+were declared lack them; databases created afterwards already have them, so
+every step checks the live schema first.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a20e166e500f'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+
+    video_constraints = {c["name"] for c in inspector.get_unique_constraints("videos")}
+    if "uq_video_user_videoid" not in video_constraints:
+        # Keep the oldest row of any duplicate (user_id, video_id) pair
+        op.execute(
+            "DELETE FROM videos a USING videos b "
+            "WHERE a.user_id = b.user_id AND a.video_id = b.video_id AND a.id > b.id"
+        )
+        op.create_unique_constraint("uq_video_user_videoid", "videos", ["user_id", "video_id"])
+
+    # Superseded by the unique constraint's index
+    if "ix_user_video" in {ix["name"] for ix in inspector.get_indexes("videos")}:
+        op.drop_index("ix_user_video", table_name="videos")
+
+    monthly_constraints = {c["name"] for c in inspector.get_unique_constraints("monthly_views")}
+    if "uq_video_year_month" not in monthly_constraints:
+        # Keep the most recently inserted row of any duplicate (video_id, year, month)
+        op.execute(
+            "DELETE FROM monthly_views a USING monthly_views b "
+            "WHERE a.video_id = b.video_id AND a.year = b.year AND a.month = b.month AND a.id < b.id"
+        )
+        op.create_unique_constraint("uq_video_year_month", "monthly_views", ["video_id", "year", "month"])
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_video_user_videoid", "videos", type_="unique")
+    op.create_index("ix_user_video", "videos", ["user_id", "video_id"])
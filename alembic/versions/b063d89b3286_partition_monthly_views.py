@@ -0,0 +1,106 @@
+"""range-partition monthly_views by (year, month)
+
+Revision ID: b063d89b3286
+Revises: 5b1b2acb525b
+Create Date: 2026-10-15 12:50:00.000000
+
+A plain table cannot be turned into a partitioned one in place, so this
+copies it: the old table is renamed aside, a partitioned monthly_views is
+created with a partition for every month that has rows (plus this month
+and the next), the rows are copied over with their ids and the old table
+is dropped. The whole swap runs in one transaction; writers to
+monthly_views wait for it, so run it outside the monthly report window.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b063d89b3286'
+down_revision = '5b1b2acb525b'
+branch_labels = None
+depends_on = None
+
+
+_COLUMNS = "id, user_id, video_id, year, month, views, views_change, updated_at"
+
+
+def _is_partitioned() -> bool:
+    return op.get_bind().execute(
+        sa.text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('monthly_views'))")
+    ).scalar()
+
+
+def _next_month(year: int, month: int) -> tuple[int, int]:
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def _swap_table(partitioned: bool) -> None:
+    """Rebuild monthly_views as a partitioned (or plain) table holding the same rows."""
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    pk_name = inspector.get_pk_constraint("monthly_views")["name"]
+    unique_names = [c["name"] for c in inspector.get_unique_constraints("monthly_views")]
+    foreign_key_names = [fk["name"] for fk in inspector.get_foreign_keys("monthly_views")]
+    index_names = [ix["name"] for ix in inspector.get_indexes("monthly_views") if not ix.get("duplicates_constraint")]
+
+    # Release index, constraint and identity sequence names so the new table gets the usual ones
+    old = "monthly_views_old"
+    op.rename_table("monthly_views", old)
+    op.execute(f"ALTER TABLE {old} ALTER COLUMN id DROP IDENTITY IF EXISTS")
+    for name in [pk_name, *unique_names, *foreign_key_names]:
+        op.drop_constraint(name, old)
+    for name in index_names:
+        op.drop_index(name, table_name=old)
+
+    op.create_table(
+        "monthly_views",
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=True), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("video_id", sa.BigInteger(), sa.ForeignKey("videos.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("views", sa.Integer(), nullable=False),
+        sa.Column("views_change", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        # Postgres requires the partition key in every unique constraint of a partitioned table
+        sa.PrimaryKeyConstraint(*(("id", "year", "month") if partitioned else ("id",)), name="monthly_views_pkey"),
+        sa.UniqueConstraint("video_id", "year", "month", name="uq_video_year_month"),
+        **({"postgresql_partition_by": "RANGE (year, month)"} if partitioned else {}),
+    )
+    op.create_index("ix_monthly_views_user_id", "monthly_views", ["user_id"])
+    op.create_index("ix_monthly_views_video_id", "monthly_views", ["video_id"])
+    op.create_index("ix_user_year_month", "monthly_views", ["user_id", "year", "month", "video_id"], postgresql_include=["views", "views_change"])
+    op.create_index("ix_video_year_month", "monthly_views", ["video_id", "year", "month"], postgresql_include=["views", "views_change"])
+
+    if partitioned:
+        op.execute("CREATE TABLE monthly_views_default PARTITION OF monthly_views DEFAULT")
+        now = datetime.now(timezone.utc)
+        months = {(now.year, now.month), _next_month(now.year, now.month)}
+        months.update(tuple(row) for row in bind.execute(sa.text(f"SELECT DISTINCT year, month FROM {old} WHERE month BETWEEN 1 AND 12")))
+        for year, month in sorted(months):
+            end_year, end_month = _next_month(year, month)
+            op.execute(
+                f"CREATE TABLE monthly_views_{year:04d}_{month:02d} "
+                f"PARTITION OF monthly_views FOR VALUES FROM ({year}, {month}) TO ({end_year}, {end_month})"
+            )
+
+    op.execute(f"INSERT INTO monthly_views ({_COLUMNS}) OVERRIDING SYSTEM VALUE SELECT {_COLUMNS} FROM {old}")
+    next_id = bind.execute(sa.text(f"SELECT coalesce(max(id), 0) + 1 FROM {old}")).scalar()
+    op.execute(f"ALTER TABLE monthly_views ALTER COLUMN id RESTART WITH {next_id}")
+    # CASCADE takes the partitions with it when downgrading
+    op.execute(f"DROP TABLE {old} CASCADE")
+
+
+def upgrade() -> None:
+    if not _is_partitioned():
+        _swap_table(partitioned=True)
+
+
+def downgrade() -> None:
+    if _is_partitioned():
+        _swap_table(partitioned=False)
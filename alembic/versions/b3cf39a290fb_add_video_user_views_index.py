@@ -0,0 +1,34 @@
+"""add the per-user videos index ordered by view count
+
+Revision ID: b3cf39a290fb
+Revises: 15910d2c33cc
+Create Date: 2026-10-15 13:10:00.000000
+
+The widened monthly_views period indexes are rebuilt by the partitioning
+revision (b063d89b3286); only the videos index is left to add here.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3cf39a290fb'
+down_revision = '15910d2c33cc'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_video_user_views", "videos", ["user_id", sa.text("last_view_count DESC")],
+            postgresql_concurrently=True, if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_video_user_views", table_name="videos", postgresql_concurrently=True)
@@ -0,0 +1,43 @@
+"""store users.discord_user_id as BIGINT
+
+Revision ID: e1adea9ef589
+Revises: 1f2f10ed5d44
+Create Date: 2026-10-15 12:20:00.000000
+
+The bot now looks users up by the integer Discord snowflake; the rewrite also
+rebuilds ix_users_discord_user_id over the 8-byte keys.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e1adea9ef589'
+down_revision = '1f2f10ed5d44'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {c["name"]: c for c in sa.inspect(op.get_bind()).get_columns("users")}
+    if isinstance(columns["discord_user_id"]["type"], sa.BigInteger):
+        return
+    op.alter_column(
+        "users", "discord_user_id",
+        type_=sa.BigInteger(),
+        existing_type=sa.String(64),
+        existing_nullable=False,
+        postgresql_using="discord_user_id::bigint",
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        "users", "discord_user_id",
+        type_=sa.String(64),
+        existing_type=sa.BigInteger(),
+        existing_nullable=False,
+        postgresql_using="discord_user_id::varchar",
+    )
@@ -0,0 +1,61 @@
+"""narrow the YouTube ID columns and give them the "C" collation
+
+Revision ID: f993709a17a6
+Revises: e1adea9ef589
+Create Date: 2026-10-15 12:30:00.000000
+
+ALTER COLUMN ... TYPE rebuilds every index on the column (the unique
+constraints, ix_*_video_id / ix_*_channel_id and the composite indexes), so
+the existing indexes switch to byte-wise comparisons as part of this revision.
+Values longer than the new limits make the ALTER fail instead of truncating.
+"""
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f993709a17a6'
+down_revision = 'e1adea9ef589'
+branch_labels = None
+depends_on = None
+
+
+# (table, column, new length)
+_ID_COLUMNS = (
+    ("videos", "video_id", 16),
+    ("channels", "channel_id", 32),
+)
+
+
+def _column_info(table: str, column: str):
+    return op.get_bind().execute(
+        sa.text(
+            "SELECT character_maximum_length, collation_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = :table AND column_name = :column"
+        ),
+        {"table": table, "column": column},
+    ).one()
+
+
+def upgrade() -> None:
+    for table, column, length in _ID_COLUMNS:
+        if tuple(_column_info(table, column)) == (length, "C"):
+            continue
+        op.alter_column(
+            table, column,
+            type_=sa.String(length, collation="C"),
+            existing_type=sa.String(128),
+            existing_nullable=False,
+        )
+
+
+def downgrade() -> None:
+    for table, column, length in _ID_COLUMNS:
+        op.alter_column(
+            table, column,
+            type_=sa.String(128, collation="default"),
+            existing_type=sa.String(length, collation="C"),
+            existing_nullable=False,
+        )
@@ -2,52 +2,179 @@ import discord
 from discord.ext import commands
 from discord import app_commands
 import asyncio
+import hashlib
+import json
 import sys
 import atexit
-import random
+import secrets
 import string
-from datetime import datetime, timezone
-from sqlalchemy import select, and_, func
+from functools import lru_cache
+from sqlalchemy import select, delete, and_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models import User, Video, MonthlyView, Channel
 from app.utils.logger import bot_logger
-from app.services.youtube import fetch_channel_videos, fetch_video_stats, is_valid_youtube_url, is_channel_url, parse_channel_id, get_channel_id_from_username_async, fetch_channel_info_async, check_verification
+from app.services.youtube import is_valid_youtube_url, is_channel_url, parse_channel_id, get_channel_id_from_username_async, fetch_channel_info_async
+from app.services.http import close_http_session
 from app.services.quota_manager import quota_manager
 from app.tasks.refresh_stats import refresh_video_stats
 from app.tasks.automatic_tracking import sync_new_videos_from_channels
-from app.config import settings
-from app.infrastructure.db import session_scope
+from app.config import get_settings
+from app.infrastructure.db import engine, readonly_scope, session_scope
+from app.infrastructure.cache import cache_get_json, cache_set_json
+from app.health import start_health_server, run_bot_heartbeat, clear_bot_heartbeat
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+class DataBot(commands.Bot):
+    _health_runner = None
+    _heartbeat_task = None
+
+    async def setup_hook(self):
+        # Serve health checks from the bot's own event loop
+        self._health_runner = await start_health_server()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def _heartbeat(self):
+        await self.wait_until_ready()
+        await run_bot_heartbeat()
+
+    async def close(self):
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+        await asyncio.to_thread(clear_bot_heartbeat)
+        if self._health_runner is not None:
+            await self._health_runner.cleanup()
+        # Write out queued quota records, then release the shared YouTube API HTTP session before the loop shuts down
+        await quota_manager.flush()
+        await close_http_session()
+        # Close pooled database connections instead of leaving them for the server to time out
+        await asyncio.to_thread(engine.dispose)
+        await super().close()
+
+bot = DataBot(command_prefix="/", intents=intents)
+
+# Clipper role id per guild, so commands don't scan guild.roles on every call
+_clipper_role_cache: dict[int, int] = {}
 
 # Helper: Generate verification code
+_ALPHABET = string.ascii_uppercase + string.digits
+
 def generate_verification_code(length: int = 6) -> str:
-    return "".join(random.choices(string.ascii_uppercase + string.digits, k=length))
+    return "".join(secrets.choice(_ALPHABET) for _ in range(length))
 
 # Helper: Format numbers
+_SUFFIXES = ((1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K"))
+
+@lru_cache(maxsize=4096)
 def format_number(num: int) -> str:
-    if num >= 1_000_000_000:
-        return f"{num / 1_000_000_000:.1f}B"
-    elif num >= 1_000_000:
-        return f"{num / 1_000_000:.1f}M"
-    elif num >= 1_000:
-        return f"{num / 1_000:.1f}K"
-    else:
-        return str(num)
+    for threshold, suffix in _SUFFIXES:
+        if num >= threshold:
+            return f"{num / threshold:.1f}{suffix}"
+    return str(num)
+
+# Helper: Get the clipper role of a guild
+def get_clipper_role(guild: discord.Guild) -> discord.Role | None:
+    role_id = _clipper_role_cache.get(guild.id)
+    if role_id is not None:
+        role = guild.get_role(role_id)
+        if role is not None:
+            return role
+    role = discord.utils.get(guild.roles, name="clipper")
+    if role is not None:
+        _clipper_role_cache[guild.id] = role.id
+    return role
+
+# Helper: Look up the user row id for a Discord member, consulting Redis before the database
+def get_user_id(session, member: discord.abc.User) -> int | None:
+    cache_key = f"user:discord:{member.id}"
+    cached = cache_get_json(cache_key)
+    if cached and cached.get("user_id"):
+        return cached["user_id"]
+    user_id = session.execute(
+        select(User.id).where(User.discord_user_id == member.id)
+    ).scalar_one_or_none()
+    if user_id is not None:
+        cache_set_json(cache_key, {"user_id": user_id}, get_settings().cache_ttl)
+    return user_id
+
+# Helper: Get the clipper role of a guild, creating it if missing.
+# The per-guild lock stops concurrent TOS clicks from creating duplicate roles.
+_clipper_role_locks: dict[int, asyncio.Lock] = {}
+
+async def get_or_create_clipper_role(guild: discord.Guild) -> discord.Role:
+    role = get_clipper_role(guild)
+    if role is not None:
+        return role
+    async with _clipper_role_locks.setdefault(guild.id, asyncio.Lock()):
+        role = get_clipper_role(guild)
+        if role is None:
+            role = await guild.create_role(
+                name="clipper",
+                color=discord.Color.blue(),
+                reason="DataBot TOS acceptance role"
+            )
+            _clipper_role_cache[guild.id] = role.id
+    return role
+
+# Helper: Get or create the user row for a Discord member in one round-trip
+def upsert_user(session, member: discord.abc.User) -> int:
+    # DO UPDATE (rather than DO NOTHING) so RETURNING also yields the id of an existing row
+    stmt = pg_insert(User).values(
+        discord_user_id=member.id,
+        discord_username=member.display_name,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["discord_user_id"],
+        set_={"discord_username": stmt.excluded.discord_username}
+    ).returning(User.id)
+    user_id = session.execute(stmt).scalar_one()
+    cache_set_json(f"user:discord:{member.id}", {"user_id": user_id}, get_settings().cache_ttl)
+    return user_id
+
+@bot.event
+async def on_guild_join(guild: discord.Guild):
+    get_clipper_role(guild)
+
+@bot.event
+async def on_guild_role_delete(role: discord.Role):
+    if _clipper_role_cache.get(role.guild.id) == role.id:
+        del _clipper_role_cache[role.guild.id]
+
+@bot.event
+async def on_guild_role_update(before: discord.Role, after: discord.Role):
+    if before.name != after.name:
+        _clipper_role_cache.pop(after.guild.id, None)
+
+# Helper: Fingerprint the registered slash commands so unchanged trees are not re-synced
+COMMAND_TREE_HASH_KEY = "discord:command_tree_hash"
+COMMAND_TREE_HASH_TTL = 30 * 86400
+
+def command_tree_hash() -> str:
+    payload = json.dumps([command.to_dict() for command in bot.tree.get_commands()], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
 
 @bot.event
 async def on_ready():
     print(f"Bot is ready as {bot.user}")
+    # Resolve clipper roles once up front so commands never scan guild roles
+    for guild in bot.guilds:
+        get_clipper_role(guild)
     try:
+        # Only push commands to Discord when their definitions changed since the last sync
+        tree_hash = command_tree_hash()
+        cached = await asyncio.to_thread(cache_get_json, COMMAND_TREE_HASH_KEY)
+        if cached and cached.get("hash") == tree_hash:
+            print("Commands unchanged, skipping sync.")
+            return
         synced = await bot.tree.sync()
+        await asyncio.to_thread(cache_set_json, COMMAND_TREE_HASH_KEY, {"hash": tree_hash}, COMMAND_TREE_HASH_TTL)
         print(f"Synced {len(synced)} commands.")
     except Exception as e:
         print(f"Failed to sync commands: {e}")
 
-@bot.tree.command(name="help", description="Show help for all available commands.")
-async def help_command(interaction: discord.Interaction):
+# Helper: Build the static /help embed once at import
+def _build_help_embed() -> discord.Embed:
     embed = discord.Embed(
         title="🤖 DataBot Commands",
         description="Here are all available commands:",
@@ -94,19 +221,16 @@ async def help_command(interaction: discord.Interaction):
         inline=False
     )
     embed.set_footer(text="DataBot - Track your YouTube growth!")
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    return embed
 
-@bot.tree.command(name="register", description="Accept Terms of Service to get clipper role and access to all commands.")
-async def register_command(interaction: discord.Interaction):
-    clipper_role = discord.utils.get(interaction.guild.roles, name="clipper")
-    if clipper_role and clipper_role in interaction.user.roles:
-        embed = discord.Embed(
-            title="✅ Already Registered",
-            description="You already have the clipper role and can use all commands!",
-            color=0x00ff00
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
+HELP_EMBED = _build_help_embed()
+
+@bot.tree.command(name="help", description="Show help for all available commands.")
+async def help_command(interaction: discord.Interaction):
+    await interaction.response.send_message(embed=HELP_EMBED, ephemeral=True)
+
+# Helper: Build the static Terms of Service prompt embed once at import
+def _build_tos_prompt_embed() -> discord.Embed:
     embed = discord.Embed(
         title="📜 Filian Clipping Community - Terms of Service",
         description=(
@@ -130,8 +254,50 @@ async def register_command(interaction: discord.Interaction):
         inline=False
     )
     embed.set_footer(text="DataBot - Terms of Service • You have 5 minutes to respond")
+    return embed
+
+TOS_PROMPT_EMBED = _build_tos_prompt_embed()
+
+ALREADY_REGISTERED_EMBED = discord.Embed(
+    title="✅ Already Registered",
+    description="You already have the clipper role and can use all commands!",
+    color=0x00ff00
+)
+
+@bot.tree.command(name="register", description="Accept Terms of Service to get clipper role and access to all commands.")
+async def register_command(interaction: discord.Interaction):
+    clipper_role = get_clipper_role(interaction.guild)
+    if clipper_role and interaction.user.get_role(clipper_role.id) is not None:
+        await interaction.response.send_message(embed=ALREADY_REGISTERED_EMBED, ephemeral=True)
+        return
     view = TOSView(interaction.user.id)
-    await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+    await interaction.response.send_message(embed=TOS_PROMPT_EMBED, view=view, ephemeral=True)
+
+# Helper: Store a fresh verification code for a member's channel; None if it is already verified.
+# Runs in a worker thread so the blocking DB calls never stall the event loop.
+def save_channel_verification(member: discord.abc.User, channel_id: str, channel_name: str | None, url: str, mode: str) -> str | None:
+    with session_scope() as session:
+        user_id = upsert_user(session, member)
+        stmt = pg_insert(Channel).values(
+            user_id=user_id,
+            channel_id=channel_id,
+            channel_name=channel_name,
+            url=url,
+            verification_code=generate_verification_code(),
+            verification_mode=mode,
+            is_verified=False,
+            is_active=True,
+        )
+        # Verified channels are left untouched, so RETURNING yields no row for them
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "channel_id"],
+            set_={
+                "verification_code": stmt.excluded.verification_code,
+                "verification_mode": stmt.excluded.verification_mode,
+            },
+            where=Channel.is_verified == False,
+        ).returning(Channel.verification_code)
+        return session.execute(stmt).scalar_one_or_none()
 
 @bot.tree.command(name="verify", description="Verify your YouTube channel ownership for tracking.")
 async def verify_command(interaction: discord.Interaction, url: str, mode: str = "manual"):
@@ -163,116 +329,132 @@ async def verify_command(interaction: discord.Interaction, url: str, mode: str =
     if not channel_info:
         await interaction.followup.send("Could not fetch channel information", ephemeral=True)
         return
-    with session_scope() as session:
-        user = session.execute(
-            select(User).where(User.discord_user_id == str(interaction.user.id))
-        ).scalar_one_or_none()
-        if user is None:
-            user = User(
-                discord_user_id=str(interaction.user.id),
-                discord_username=interaction.user.display_name,
-                created_at=datetime.now(timezone.utc)
-            )
-            session.add(user)
-            session.flush()
-        existing_channel = session.execute(
-            select(Channel).where(
-                and_(
-                    Channel.user_id == user.id,
-                    Channel.channel_id == channel_id
-                )
-            )
-        ).scalar_one_or_none()
-        if existing_channel:
-            if existing_channel.is_verified:
-                await interaction.followup.send("Channel already verified!", ephemeral=True)
-                return
-            else:
-                existing_channel.verification_code = generate_verification_code()
-                existing_channel.verification_mode = mode
-                verification_code = existing_channel.verification_code
-        else:
-            verification_code = generate_verification_code()
-            channel = Channel(
-                user_id=user.id,
-                channel_id=channel_id,
-                channel_name=channel_info.channel_name,
-                url=url,
-                verification_code=verification_code,
-                verification_mode=mode,
-                created_at=datetime.now(timezone.utc),
-            )
-            session.add(channel)
-        embed = discord.Embed(
-            title="🔐 Verification Required",
-            description=f"Add `{verification_code}` to your channel description, then run /done",
-            color=0xffff00
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+    verification_code = await asyncio.to_thread(
+        save_channel_verification, interaction.user, channel_id, channel_info.channel_name, url, mode
+    )
+    if verification_code is None:
+        await interaction.followup.send("Channel already verified!", ephemeral=True)
+        return
+    embed = discord.Embed(
+        title="🔐 Verification Required",
+        description=f"Add `{verification_code}` to your channel description, then run /done",
+        color=0xffff00
+    )
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
+NO_VIDEOS_EMBED = discord.Embed(
+    title="📺 No Videos",
+    description="Use /add to add your first video.",
+    color=0x00ff00
+)
+
+# Helper: Count a member's videos and fetch the top five by views; None if the member has no user row.
+# Runs in a worker thread so the blocking DB calls never stall the event loop.
+def load_video_summary(member: discord.abc.User) -> tuple[int, list] | None:
+    with readonly_scope() as connection:
+        user_id = get_user_id(connection, member)
+        if user_id is None:
+            return None
+        video_count = connection.execute(
+            select(func.count(Video.id)).where(Video.user_id == user_id)
+        ).scalar_one()
+        if not video_count:
+            return 0, []
+        # Let the database pick the top five so the other rows never leave it
+        top_videos = connection.execute(
+            select(Video.display_title.label("display_title"), Video.last_view_count)
+            .where(Video.user_id == user_id)
+            .order_by(Video.last_view_count.desc())
+            .limit(5)
+        ).all()
+        return video_count, top_videos
 
 @bot.tree.command(name="videos", description="List all your tracked videos.")
 async def videos_command(interaction: discord.Interaction):
-    with session_scope() as session:
-        user = session.execute(
-            select(User).where(User.discord_user_id == str(interaction.user.id))
-        ).scalar_one_or_none()
-        if user is None:
-            await interaction.response.send_message("No videos found. Use /add to add your first video", ephemeral=True)
-            return
-        videos = session.execute(
-            select(Video).where(Video.user_id == user.id).order_by(Video.created_at.desc())
-        ).scalars().all()
-        if not videos:
-            embed = discord.Embed(
-                title="📺 No Videos",
-                description="Use /add to add your first video.",
-                color=0x00ff00
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        embed = discord.Embed(
-            title="📺 Your Videos",
-            description=f"{len(videos)} video(s):",
-            color=0x00ff00
-        )
-        top_videos = sorted(videos, key=lambda x: x.last_view_count, reverse=True)[:5]
-        video_text = []
-        for i, video in enumerate(top_videos, 1):
-            title = video.title or f"Video {video.video_id}"
-            video_text.append(f"{i}. {title} - {format_number(video.last_view_count)}")
-        embed.add_field(name="Top Videos", value="\n".join(video_text), inline=False)
-        if len(videos) > 5:
-            embed.add_field(name="More", value=f"+{len(videos) - 5} more videos", inline=False)
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+    summary = await asyncio.to_thread(load_video_summary, interaction.user)
+    if summary is None:
+        await interaction.response.send_message("No videos found. Use /add to add your first video", ephemeral=True)
+        return
+    video_count, top_videos = summary
+    if not video_count:
+        await interaction.response.send_message(embed=NO_VIDEOS_EMBED, ephemeral=True)
+        return
+    embed = discord.Embed(
+        title="📺 Your Videos",
+        description=f"{video_count} video(s):",
+        color=0x00ff00
+    )
+    video_text = "\n".join(
+        f"{i}. {video.display_title} - {format_number(video.last_view_count)}"
+        for i, video in enumerate(top_videos, 1)
+    )
+    embed.add_field(name="Top Videos", value=video_text, inline=False)
+    if video_count > 5:
+        embed.add_field(name="More", value=f"+{video_count - 5} more videos", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
-@bot.tree.command(name="remove", description="Remove a video from tracking.")
-async def remove_command(interaction: discord.Interaction, video_id: str):
+# Helper: Delete one of a member's videos; returns (member has a user row, removed video title or None).
+# Runs in a worker thread so the blocking DB calls never stall the event loop.
+def remove_video(member: discord.abc.User, video_id: str) -> tuple[bool, str | None]:
     with session_scope() as session:
-        user = session.execute(
-            select(User).where(User.discord_user_id == str(interaction.user.id))
-        ).scalar_one_or_none()
-        if user is None:
-            await interaction.response.send_message("No videos found", ephemeral=True)
-            return
-        video = session.execute(
-            select(Video).where(
+        user_id = get_user_id(session, member)
+        if user_id is None:
+            return False, None
+        # Single DELETE ... RETURNING; monthly view rows go with it through the ON DELETE CASCADE foreign key
+        title = session.execute(
+            delete(Video)
+            .where(
                 and_(
-                    Video.user_id == user.id,
+                    Video.user_id == user_id,
                     Video.video_id == video_id
                 )
             )
+            .returning(Video.display_title)
+            .execution_options(synchronize_session=False)
         ).scalar_one_or_none()
-        if not video:
-            await interaction.response.send_message(f"No video found with ID `{video_id}`. Use /videos to see your tracked videos", ephemeral=True)
-            return
-        title = video.title or f"Video {video.video_id}"
-        session.delete(video)
-        embed = discord.Embed(
-            title="✅ Removed",
-            description=f"Removed **{title}** from tracking.",
-            color=0x00ff00
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return True, title
+
+@bot.tree.command(name="remove", description="Remove a video from tracking.")
+async def remove_command(interaction: discord.Interaction, video_id: str):
+    found_user, title = await asyncio.to_thread(remove_video, interaction.user, video_id)
+    if not found_user:
+        await interaction.response.send_message("No videos found", ephemeral=True)
+        return
+    if title is None:
+        await interaction.response.send_message(f"No video found with ID `{video_id}`. Use /videos to see your tracked videos", ephemeral=True)
+        return
+    embed = discord.Embed(
+        title="✅ Removed",
+        description=f"Removed **{title}** from tracking.",
+        color=0x00ff00
+    )
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+TOS_ACCEPTED_EMBED = discord.Embed(
+    title="✅ Terms of Service Accepted",
+    description=(
+        "**Welcome to the Filian Clipping Community!** 🎉\n\n"
+        "You have successfully accepted the Terms of Service and received the **clipper** role.\n\n"
+        "**You can now use all DataBot commands:**\n"
+        "• `/verify <channel_url>` - Add your YouTube/TikTok/Instagram channel\n"
+        "• `/add <video_url>` - Track a video (monthly views only)\n"
+        "• `/videos` - View your tracked videos\n"
+        "• `/stats` - View monthly view statistics\n"
+        "• `/help` - See all available commands\n\n"
+        "**Happy clipping!** ✂️"
+    ),
+    color=0x00ff00
+)
+
+TOS_DECLINED_EMBED = discord.Embed(
+    title="❌ Terms of Service Declined",
+    description=(
+        "You have declined the Terms of Service.\n\n"
+        "**You cannot use DataBot commands without accepting the TOS.**\n\n"
+        "If you change your mind, you can run `/register` again to accept the terms."
+    ),
+    color=0xff0000
+)
 
 class TOSView(discord.ui.View):
     def __init__(self, user_id: int):
@@ -283,38 +465,17 @@ class TOSView(discord.ui.View):
         if interaction.user.id != self.user_id:
             await interaction.response.send_message("❌ This button is not for you!", ephemeral=True)
             return
-        clipper_role = discord.utils.get(interaction.guild.roles, name="clipper")
-        if not clipper_role:
-            try:
-                clipper_role = await interaction.guild.create_role(
-                    name="clipper",
-                    color=discord.Color.blue(),
-                    reason="DataBot TOS acceptance role"
-                )
-            except discord.Forbidden:
-                await interaction.response.send_message(
-                    "❌ Bot doesn't have permission to create roles. Please ask an admin to create a 'clipper' role.",
-                    ephemeral=True
-                )
-                return
         try:
-            await interaction.user.add_roles(clipper_role)
-            embed = discord.Embed(
-                title="✅ Terms of Service Accepted",
-                description=(
-                    "**Welcome to the Filian Clipping Community!** 🎉\n\n"
-                    "You have successfully accepted the Terms of Service and received the **clipper** role.\n\n"
-                    "**You can now use all DataBot commands:**\n"
-                    "• `/verify <channel_url>` - Add your YouTube/TikTok/Instagram channel\n"
-                    "• `/add <video_url>` - Track a video (monthly views only)\n"
-                    "• `/videos` - View your tracked videos\n"
-                    "• `/stats` - View monthly view statistics\n"
-                    "• `/help` - See all available commands\n\n"
-                    "**Happy clipping!** ✂️"
-                ),
-                color=0x00ff00
+            clipper_role = await get_or_create_clipper_role(interaction.guild)
+        except discord.Forbidden:
+            await interaction.response.send_message(
+                "❌ Bot doesn't have permission to create roles. Please ask an admin to create a 'clipper' role.",
+                ephemeral=True
             )
-            await interaction.response.send_message(embed=embed, ephemeral=False)
+            return
+        try:
+            await interaction.user.add_roles(clipper_role)
+            await interaction.response.send_message(embed=TOS_ACCEPTED_EMBED, ephemeral=False)
         except discord.Forbidden:
             await interaction.response.send_message(
                 "❌ Bot doesn't have permission to assign roles. Please ask an admin to assign the 'clipper' role manually.",
@@ -325,19 +486,10 @@ class TOSView(discord.ui.View):
         if interaction.user.id != self.user_id:
             await interaction.response.send_message("❌ This button is not for you!", ephemeral=True)
             return
-        embed = discord.Embed(
-            title="❌ Terms of Service Declined",
-            description=(
-                "You have declined the Terms of Service.\n\n"
-                "**You cannot use DataBot commands without accepting the TOS.**\n\n"
-                "If you change your mind, you can run `/register` again to accept the terms."
-            ),
-            color=0xff0000
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        await interaction.response.send_message(embed=TOS_DECLINED_EMBED, ephemeral=True)
 
 def main():
-    bot.run(settings.discord_bot_token)
+    bot.run(get_settings().discord_bot_token)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+import msgspec
+
+
+class VideoStatsDTO(msgspec.Struct, array_like=True):
+    """Cached YouTube statistics for one video.
+
+    Encoded as a msgpack array (no field names on the wire) and decoded by a
+    typed decoder, so cache reads skip generic dict handling.
+    """
+
+    video_id: str
+    title: Optional[str]
+    description: Optional[str]
+    thumbnail_url: Optional[str]
+    published_at: Optional[datetime]
+    view_count: int
+    like_count: int
+    comment_count: int
@@ -3,18 +3,21 @@ Health check endpoint for Render deployment.
 This provides a simple HTTP endpoint for health checks.
 """
 
+import asyncio
 import os
-import threading
 import time
-from flask import Flask, jsonify
+from typing import Optional
+from aiohttp import web
 from app.infrastructure.db import check_database_health
-from app.infrastructure.cache import check_redis_health
+from app.infrastructure.cache import check_redis_health, cache_set_json, cache_exists, cache_delete
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-# Create Flask app
-app = Flask(__name__)
+# Bot liveness: refreshed every BOT_HEARTBEAT_INTERVAL seconds, expires after BOT_HEARTBEAT_TTL
+BOT_HEARTBEAT_KEY = "bot:heartbeat"
+BOT_HEARTBEAT_TTL = 30
+BOT_HEARTBEAT_INTERVAL = 10
 
 # Health check status
 health_status = {
@@ -27,23 +30,33 @@ health_status = {
     }
 }
 
-def update_health_status():
+# Probes within this many seconds of the last check reuse its result
+_CHECK_TTL = 5.0
+_last_check_ts = 0.0
+
+async def update_health_status():
     """Update health status by checking all services"""
+    global _last_check_ts
+    if time.monotonic() - _last_check_ts < _CHECK_TTL:
+        return
+    
     try:
-        # Check database
-        health_status["checks"]["database"] = check_database_health()
-        
-        # Check Redis
-        health_status["checks"]["redis"] = check_redis_health()
+        # Check database and Redis concurrently; both checks block, so run them in threads
+        database_ok, redis_ok = await asyncio.gather(
+            asyncio.to_thread(check_database_health),
+            asyncio.to_thread(check_redis_health),
+        )
+        health_status["checks"]["database"] = database_ok
+        health_status["checks"]["redis"] = redis_ok
         
-        # Check if bot is running (simple file-based check)
-        bot_running = os.path.exists("/tmp/databot_running")
-        health_status["checks"]["bot"] = bot_running
+        # Check if bot is running (heartbeat key expires on its own if the bot dies)
+        health_status["checks"]["bot"] = await asyncio.to_thread(cache_exists, BOT_HEARTBEAT_KEY)
         
         # Overall status
         all_healthy = all(health_status["checks"].values())
         health_status["status"] = "healthy" if all_healthy else "unhealthy"
         health_status["timestamp"] = time.time()
+        _last_check_ts = time.monotonic()
         
         logger.info(f"Health check updated: {health_status}")
         
@@ -52,57 +65,53 @@ def update_health_status():
         health_status["status"] = "error"
         health_status["error"] = str(e)
 
-@app.route('/health')
-def health_check():
+async def health_check(request: web.Request) -> web.Response:
     """Health check endpoint for Render"""
-    update_health_status()
+    await update_health_status()
     
     if health_status["status"] == "healthy":
-        return jsonify(health_status), 200
+        return web.json_response(health_status, status=200)
     else:
-        return jsonify(health_status), 503
+        return web.json_response(health_status, status=503)
 
-@app.route('/')
-def root():
+async def root(request: web.Request) -> web.Response:
     """Root endpoint"""
-    return jsonify({
+    return web.json_response({
         "service": "DataBot",
         "status": "running",
         "version": "1.0.0"
-    }), 200
+    }, status=200)
 
-def start_health_server(host='0.0.0.0', port=None):
-    """Start the health check server in a separate thread"""
+def create_health_app() -> web.Application:
+    """Create the health check application"""
+    app = web.Application()
+    app.add_routes([web.get('/health', health_check), web.get('/', root)])
+    return app
+
+async def start_health_server(host='0.0.0.0', port=None) -> Optional[web.AppRunner]:
+    """Start the health check server on the running event loop"""
     # Use PORT environment variable for Render, fallback to 8080
     if port is None:
         port = int(os.getenv('PORT', 8080))
     
-    def run_server():
-        try:
-            logger.info(f"Starting health check server on {host}:{port}")
-            app.run(host=host, port=port, debug=False, use_reloader=False)
-        except Exception as e:
-            logger.error(f"Failed to start health server: {e}")
-    
-    # Start server in background thread
-    server_thread = threading.Thread(target=run_server, daemon=True)
-    server_thread.start()
-    logger.info("Health check server started in background thread")
-
-def mark_bot_running():
-    """Mark that the bot is running"""
+    runner = web.AppRunner(create_health_app(), access_log=None)
     try:
-        with open("/tmp/databot_running", "w") as f:
-            f.write(str(time.time()))
-        logger.info("Bot running status marked")
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        logger.info(f"Health check server started on {host}:{port}")
+        return runner
     except Exception as e:
-        logger.error(f"Failed to mark bot running: {e}")
+        logger.error(f"Failed to start health server: {e}")
+        await runner.cleanup()
+        return None
+
+async def run_bot_heartbeat():
+    """Refresh the bot heartbeat key until cancelled"""
+    while True:
+        await asyncio.to_thread(cache_set_json, BOT_HEARTBEAT_KEY, {"timestamp": time.time()}, BOT_HEARTBEAT_TTL)
+        await asyncio.sleep(BOT_HEARTBEAT_INTERVAL)
 
-def mark_bot_stopped():
+def clear_bot_heartbeat():
     """Mark that the bot has stopped"""
-    try:
-        if os.path.exists("/tmp/databot_running"):
-            os.remove("/tmp/databot_running")
-        logger.info("Bot running status cleared")
-    except Exception as e:
-        logger.error(f"Failed to clear bot running status: {e}")
+    cache_delete(BOT_HEARTBEAT_KEY)
+    logger.info("Bot heartbeat cleared")
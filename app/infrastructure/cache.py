@@ -1,78 +1,190 @@
 from __future__ import annotations
 
-import json
+import hashlib
+import logging
+import random
 import time
-from typing import Any, Optional, Union
-from functools import wraps
+from typing import Any, Optional, TypeVar, Union
+from functools import lru_cache, wraps
 
+import lz4.frame
+import msgspec
 import redis
 from redis.exceptions import RedisError, ConnectionError, TimeoutError
 
-from app.config import settings
+from app.config import get_settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
-_redis_client: Optional[redis.Redis] = None
-_cache_enabled: bool = True
+# Logging is configured when app.utils.logger is imported, so the level is settled here.
+# Hot-path debug calls check this flag first so their extra dicts are never built at INFO.
+_DEBUG = logger.isEnabledFor(logging.DEBUG)
 
+class _NullPipeline:
+    """Pipeline stand-in for _NullRedis that drops every command."""
 
-def get_redis() -> redis.Redis:
-    """Get Redis client instance with lazy initialization and connection pooling."""
+    def setex(self, *args, **kwargs):
+        return self
+
+    def incrby(self, *args, **kwargs):
+        return self
+
+    def expire(self, *args, **kwargs):
+        return self
+
+    def execute(self) -> list:
+        return []
+
+
+class _NullRedis:
+    """Stand-in client used while Redis is unreachable.
+
+    Reads miss, writes are dropped and locks are granted (fail open), so cache
+    helpers can call through unconditionally instead of checking a flag.
+    get_redis() retries a real connection once REDIS_RECONNECT_INTERVAL has
+    passed since ``failed_at``.
+    """
+
+    def __init__(self):
+        self.failed_at = time.monotonic()
+
+    def ping(self) -> bool:
+        return False
+
+    def get(self, key):
+        return None
+
+    def mget(self, keys):
+        return [None] * len(keys)
+
+    def setex(self, key, ttl_seconds, value) -> bool:
+        return False
+
+    def set(self, key, value, **kwargs) -> bool:
+        return True
+
+    def delete(self, *keys) -> int:
+        return 0
+
+    def exists(self, *keys) -> int:
+        return 0
+
+    def pipeline(self, transaction: bool = True) -> _NullPipeline:
+        return _NullPipeline()
+
+    def info(self) -> dict:
+        return {}
+
+
+# Hot-path helpers use _redis_client directly once it is a real client; until then they go
+# through get_redis(), which connects (or reconnects after an outage) as needed
+_redis_client: Optional[Union[redis.Redis, _NullRedis]] = None
+
+# Seconds between reconnect attempts while the _NullRedis stand-in is installed
+REDIS_RECONNECT_INTERVAL = 30.0
+
+# Cache values are msgpack-encoded; types msgpack can't represent fall back to str()
+_encoder = msgspec.msgpack.Encoder(enc_hook=str)
+_decoder = msgspec.msgpack.Decoder()
+
+# Stored values start with a 1-byte tag; payloads above the threshold are LZ4-compressed
+_RAW_TAG = b"\x00"
+_LZ4_TAG = b"\x01"
+COMPRESSION_THRESHOLD_BYTES = 1024
+
+T = TypeVar("T", bound=msgspec.Struct)
+
+
+@lru_cache(maxsize=None)
+def _typed_decoder(type_: type[T]) -> msgspec.msgpack.Decoder:
+    """One decoder per Struct type; msgspec specializes it at construction."""
+    return msgspec.msgpack.Decoder(type_)
+
+
+def _pack(value: Any) -> bytes:
+    payload = _encoder.encode(value)
+    if len(payload) > COMPRESSION_THRESHOLD_BYTES:
+        return _LZ4_TAG + lz4.frame.compress(payload, compression_level=1)
+    return _RAW_TAG + payload
+
+
+def _unpack(raw: bytes, decoder: msgspec.msgpack.Decoder) -> Any:
+    tag = raw[:1]
+    if tag == _LZ4_TAG:
+        return decoder.decode(lz4.frame.decompress(raw[1:]))
+    if tag == _RAW_TAG:
+        return decoder.decode(memoryview(raw)[1:])
+    # Untagged entry written before compression was added
+    return decoder.decode(raw)
+
+
+def get_redis() -> Union[redis.Redis, _NullRedis]:
+    """Get Redis client instance with lazy initialization and connection pooling.
+    
+    Returns a _NullRedis stand-in if Redis cannot be reached. Every process retries
+    on its own once REDIS_RECONNECT_INTERVAL has passed, so a Celery worker that started
+    during a Redis outage recovers without a restart.
+    """
     global _redis_client
-    if _redis_client is None:
+    if _redis_client is None or (
+        isinstance(_redis_client, _NullRedis)
+        and time.monotonic() - _redis_client.failed_at >= REDIS_RECONNECT_INTERVAL
+    ):
+        settings = get_settings()
         try:
-            # Configure Redis client with connection pooling
-            _redis_client = redis.from_url(
+            # Blocking pool: under bursts callers wait up to redis_pool_timeout for a connection instead of erroring
+            pool = redis.BlockingConnectionPool.from_url(
                 settings.redis_url,
-                decode_responses=True,
+                max_connections=settings.redis_pool_size,
+                timeout=settings.redis_pool_timeout,
+                decode_responses=False,  # values are binary msgpack
                 socket_connect_timeout=5,
                 socket_timeout=5,
                 retry_on_timeout=True,
-                health_check_interval=30,
-                max_connections=20
+                health_check_interval=30
             )
+            client = redis.Redis(connection_pool=pool)
             
             # Test connection
-            _redis_client.ping()
+            client.ping()
+            _redis_client = client
             logger.info("Redis connection established", extra={
                 "redis_url": settings.redis_url.split("@")[-1] if "@" in settings.redis_url else "local",
-                "max_connections": 20
+                "max_connections": settings.redis_pool_size
             })
             
         except RedisError as e:
-            logger.error("Failed to connect to Redis", extra={
-                "redis_url": settings.redis_url,
+            logger.error("Failed to connect to Redis, caching disabled until it recovers", extra={
+                "redis_url": settings.redis_url.split("@")[-1] if "@" in settings.redis_url else "local",
                 "error": str(e),
                 "error_type": type(e).__name__
             })
-            _cache_enabled = False
-            raise
+            _redis_client = _NullRedis()
     
     return _redis_client
 
 
 def check_redis_health() -> bool:
-    """Check if Redis is healthy and accessible."""
-    global _cache_enabled
+    """Check if Redis is healthy and accessible, reconnecting if it was unreachable."""
+    global _redis_client
     
-    if not _cache_enabled:
-        return False
+    if isinstance(_redis_client, _NullRedis):
+        # Drop the stand-in so get_redis() tries a real connection again
+        _redis_client = None
     
     try:
         redis_client = get_redis()
-        redis_client.ping()
-        return True
+        return bool(redis_client.ping())
     except Exception as e:
         logger.warning("Redis health check failed", extra={
             "error": str(e),
             "error_type": type(e).__name__
         })
-        _cache_enabled = False
         return False
 
 
-def wait_for_redis(max_retries: int = 30, retry_delay: float = 2.0) -> bool:
+def wait_for_redis(max_retries: int = 10, retry_delay: float = 2.0) -> bool:
     """Wait for Redis to become available."""
     logger.info("Waiting for Redis to become available...")
     
@@ -81,36 +193,36 @@ def wait_for_redis(max_retries: int = 30, retry_delay: float = 2.0) -> bool:
             logger.info("Redis is available", extra={"attempts": attempt + 1})
             return True
         
-        logger.warning(f"Redis not available, retrying in {retry_delay}s...", extra={
+        # Exponential backoff capped at 30s, with jitter so restarted workers don't retry in lockstep
+        delay = min(retry_delay * (2 ** attempt), 30.0)
+        delay += random.uniform(0, 0.5 * delay)
+        logger.warning(f"Redis not available, retrying in {delay:.1f}s...", extra={
             "attempt": attempt + 1,
             "max_retries": max_retries
         })
-        time.sleep(retry_delay)
+        time.sleep(delay)
     
     logger.error("Redis failed to become available", extra={"max_retries": max_retries})
     return False
 
 
-def cache_get_json(key: str) -> Optional[dict[str, Any]]:
-    """Get JSON data from cache with fallback."""
-    if not _cache_enabled:
-        logger.debug("Cache disabled, skipping get", extra={"cache_key": key})
-        return None
-    
+def _cache_get(key: str, decoder: msgspec.msgpack.Decoder) -> Any:
     try:
-        redis_client = get_redis()
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
         raw = redis_client.get(key)
         
         if not raw:
-            logger.debug("Cache miss", extra={"cache_key": key})
+            if _DEBUG:
+                logger.debug("Cache miss", extra={"cache_key": key})
             return None
         
-        data = json.loads(raw)
-        logger.debug("Cache hit", extra={"cache_key": key})
+        data = _unpack(raw, decoder)
+        if _DEBUG:
+            logger.debug("Cache hit", extra={"cache_key": key})
         return data
         
-    except json.JSONDecodeError as e:
-        logger.warning("Invalid JSON in cache", extra={
+    except (msgspec.DecodeError, RuntimeError) as e:  # lz4 raises RuntimeError on a corrupt frame
+        logger.warning("Invalid data in cache", extra={
             "cache_key": key,
             "error": str(e)
         })
@@ -138,25 +250,32 @@ def cache_get_json(key: str) -> Optional[dict[str, Any]]:
         return None
 
 
-def cache_set_json(key: str, value: dict[str, Any], ttl_seconds: int) -> bool:
-    """Set JSON data in cache with TTL. Returns True if successful."""
-    if not _cache_enabled:
-        logger.debug("Cache disabled, skipping set", extra={"cache_key": key})
-        return False
-    
+def cache_get_json(key: str) -> Optional[dict[str, Any]]:
+    """Get a cached dict (msgpack-encoded) with fallback."""
+    return _cache_get(key, _decoder)
+
+
+def cache_get_typed(key: str, type_: type[T]) -> Optional[T]:
+    """Get a cached msgspec Struct, decoded with a typed decoder; entries of another shape miss."""
+    return _cache_get(key, _typed_decoder(type_))
+
+
+def cache_set_json(key: str, value: Union[dict[str, Any], msgspec.Struct], ttl_seconds: int) -> bool:
+    """Set a dict or msgspec Struct in cache (msgpack-encoded) with TTL. Returns True if successful."""
     try:
-        json_data = json.dumps(value, default=str)  # Handle datetime objects
-        redis_client = get_redis()
-        redis_client.setex(key, ttl_seconds, json_data)
+        payload = _pack(value)
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
+        redis_client.setex(key, ttl_seconds, payload)
         
-        logger.debug("Cache set successfully", extra={
-            "cache_key": key,
-            "ttl_seconds": ttl_seconds
-        })
+        if _DEBUG:
+            logger.debug("Cache set successfully", extra={
+                "cache_key": key,
+                "ttl_seconds": ttl_seconds
+            })
         return True
         
-    except json.JSONEncodeError as e:
-        logger.error("Failed to encode JSON for cache", extra={
+    except msgspec.EncodeError as e:
+        logger.error("Failed to encode value for cache", extra={
             "cache_key": key,
             "error": str(e)
         })
@@ -179,15 +298,149 @@ def cache_set_json(key: str, value: dict[str, Any], ttl_seconds: int) -> bool:
         return False
 
 
-def cache_delete(key: str) -> bool:
-    """Delete a key from cache. Returns True if successful."""
-    if not _cache_enabled:
+def _cache_mget(keys: list[str], decoder: msgspec.msgpack.Decoder) -> list[Any]:
+    if not keys:
+        return []
+    
+    try:
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
+        raw_values = redis_client.mget(keys)
+    except Exception as e:
+        logger.error("Redis error during cache mget", extra={
+            "key_count": len(keys),
+            "error": str(e),
+            "error_type": type(e).__name__
+        })
+        return [None] * len(keys)
+    
+    values = []
+    for key, raw in zip(keys, raw_values):
+        if not raw:
+            values.append(None)
+            continue
+        try:
+            values.append(_unpack(raw, decoder))
+        except (msgspec.DecodeError, RuntimeError) as e:  # lz4 raises RuntimeError on a corrupt frame
+            logger.warning("Invalid data in cache", extra={
+                "cache_key": key,
+                "error": str(e)
+            })
+            values.append(None)
+    
+    if _DEBUG:
+        logger.debug("Cache mget", extra={
+            "key_count": len(keys),
+            "hits": sum(value is not None for value in values)
+        })
+    return values
+
+
+def cache_mget_json(keys: list[str]) -> list[Optional[dict[str, Any]]]:
+    """Get many cached dicts in one round-trip. Misses and undecodable entries come back as None."""
+    return _cache_mget(keys, _decoder)
+
+
+def cache_mget_typed(keys: list[str], type_: type[T]) -> list[Optional[T]]:
+    """Get many cached msgspec Structs of one type in one round-trip; misses come back as None."""
+    return _cache_mget(keys, _typed_decoder(type_))
+
+
+def cache_mset_json(items: dict[str, tuple[Union[dict[str, Any], msgspec.Struct], int]]) -> bool:
+    """Set many dicts or Structs, each with its own TTL, in one pipelined round-trip. Returns True if successful."""
+    if not items:
         return False
     
     try:
-        redis_client = get_redis()
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
+        pipe = redis_client.pipeline(transaction=False)
+        for key, (value, ttl_seconds) in items.items():
+            pipe.setex(key, ttl_seconds, _pack(value))
+        pipe.execute()
+        if _DEBUG:
+            logger.debug("Cache mset", extra={"key_count": len(items)})
+        return True
+    except Exception as e:
+        logger.error("Redis error during cache mset", extra={
+            "key_count": len(items),
+            "error": str(e),
+            "error_type": type(e).__name__
+        })
+        return False
+
+
+def cache_incr_counters(increments: dict[str, tuple[int, int]]) -> dict[str, int]:
+    """INCRBY many integer counters, each with its own TTL, in one pipelined round-trip.
+    
+    The TTL is set only when a counter is created (EXPIRE NX), so date-stamped keys expire on their own.
+    Returns the new value of each counter, or an empty dict if Redis is unavailable.
+    """
+    if not increments:
+        return {}
+    
+    try:
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
+        pipe = redis_client.pipeline(transaction=False)
+        for key, (amount, ttl_seconds) in increments.items():
+            pipe.incrby(key, amount)
+            pipe.expire(key, ttl_seconds, nx=True)
+        # Replies alternate INCRBY result, EXPIRE result
+        return dict(zip(increments, pipe.execute()[::2]))
+    except Exception as e:
+        logger.error("Redis error during counter increment", extra={
+            "key_count": len(increments),
+            "error": str(e),
+            "error_type": type(e).__name__
+        })
+        return {}
+
+
+def cache_get_counters(keys: list[str]) -> list[int]:
+    """Read many integer counters in one MGET; missing keys (or an unreachable Redis) read as 0."""
+    if not keys:
+        return []
+    
+    try:
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
+        return [int(raw) if raw else 0 for raw in redis_client.mget(keys)]
+    except Exception as e:
+        logger.error("Redis error during counter read", extra={
+            "key_count": len(keys),
+            "error": str(e),
+            "error_type": type(e).__name__
+        })
+        return [0] * len(keys)
+
+
+# Script objects keyed by source; each computes its SHA once and EVALSHAs, loading on NOSCRIPT
+_scripts: dict[str, Any] = {}
+
+
+def cache_run_script(source: str, keys: list[str], args: list[Any]) -> Optional[Any]:
+    """Run a Lua script atomically in Redis. Returns None if Redis is unavailable."""
+    try:
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
+        if isinstance(redis_client, _NullRedis):
+            return None
+        script = _scripts.get(source)
+        if script is None:
+            script = _scripts[source] = redis_client.register_script(source)
+        return script(keys=keys, args=args, client=redis_client)
+    except Exception as e:
+        logger.error("Redis error during script run", extra={
+            "keys": keys,
+            "error": str(e),
+            "error_type": type(e).__name__
+        })
+        return None
+
+
+def cache_delete(key: str) -> bool:
+    """Delete a key from cache. Returns True if successful."""
+    try:
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
         result = redis_client.delete(key)
-        logger.debug("Cache key deleted", extra={"cache_key": key, "deleted": bool(result)})
+        if _DEBUG:
+            logger.debug("Cache key deleted", extra={"cache_key": key, "deleted": bool(result)})
         return bool(result)
     except Exception as e:
         logger.error("Failed to delete cache key", extra={
@@ -199,11 +452,8 @@ def cache_delete(key: str) -> bool:
 
 def cache_exists(key: str) -> bool:
     """Check if a key exists in cache."""
-    if not _cache_enabled:
-        return False
-    
     try:
-        redis_client = get_redis()
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
         return bool(redis_client.exists(key))
     except Exception as e:
         logger.error("Failed to check cache key existence", extra={
@@ -213,16 +463,43 @@ def cache_exists(key: str) -> bool:
         return False
 
 
+def cache_acquire_lock(key: str, ttl_seconds: int) -> bool:
+    """Take a short-lived lock with SET NX EX. Returns True if acquired.
+    
+    Fails open (returns True) when Redis is unavailable so work is never blocked by the cache.
+    """
+    try:
+        redis_client = _redis_client if type(_redis_client) is redis.Redis else get_redis()
+        acquired = bool(redis_client.set(key, "1", nx=True, ex=ttl_seconds))
+        if _DEBUG:
+            logger.debug("Cache lock requested", extra={"cache_key": key, "acquired": acquired})
+        return acquired
+    except Exception as e:
+        logger.error("Failed to acquire cache lock", extra={
+            "cache_key": key,
+            "error": str(e)
+        })
+        return True
+
+
 def get_cache_stats() -> dict:
     """Get Redis cache statistics."""
-    if not _cache_enabled:
-        return {"enabled": False}
-    
     try:
         redis_client = get_redis()
-        info = redis_client.info()
+        if isinstance(redis_client, _NullRedis):
+            return {"enabled": False}
+        # One round-trip, and only the INFO sections we report instead of the full blob
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.ping()
+        for section in ("clients", "memory", "stats", "server"):
+            pipe.info(section)
+        healthy, *sections = pipe.execute()
+        info = {}
+        for section_info in sections:
+            info.update(section_info)
         return {
             "enabled": True,
+            "healthy": bool(healthy),
             "connected_clients": info.get("connected_clients", 0),
             "used_memory_human": info.get("used_memory_human", "0B"),
             "keyspace_hits": info.get("keyspace_hits", 0),
@@ -240,10 +517,14 @@ def get_cache_stats() -> dict:
 def cached(ttl_seconds: int = 3600):
     """Decorator to cache function results."""
     def decorator(func):
+        # Built once per decorated function; each call only appends the argument hash
+        key_prefix = f"{func.__module__}.{func.__qualname__}:"
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            # Create cache key from function name and arguments
-            cache_key = f"{func.__name__}:{hash(str(args) + str(sorted(kwargs.items())))}"
+            # Stable across processes (unlike hash()), so every worker shares the same entries
+            payload = _encoder.encode((args, sorted(kwargs.items())))
+            cache_key = key_prefix + hashlib.blake2b(payload, digest_size=16).hexdigest()
             
             # Try to get from cache first
             cached_result = cache_get_json(cache_key)
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
 from contextlib import contextmanager
+from datetime import datetime, timezone
 from typing import Iterator, Optional
+import random
 import time
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from sqlalchemy.exc import SQLAlchemyError, OperationalError
 from sqlalchemy.pool import QueuePool
 
-from app.config import settings
+from app.config import get_settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -21,13 +24,15 @@ class Base(DeclarativeBase):
 
 def create_database_engine():
     """Create database engine with optimized settings for production."""
+    settings = get_settings()
     # Connection pool settings
     pool_settings = {
         "poolclass": QueuePool,
-        "pool_size": 10,
-        "max_overflow": 20,
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_pool_overflow,
         "pool_pre_ping": True,
-        "pool_recycle": 3600,  # Recycle connections after 1 hour
+        "pool_use_lifo": True,  # Reuse the most recently returned (warm) connection; idle extras age out via pool_recycle
+        "pool_recycle": 1800,  # Recycle connections after 30 minutes, below typical 1h idle kills
         "pool_timeout": 30,    # Wait up to 30 seconds for a connection
     }
     
@@ -35,14 +40,19 @@ def create_database_engine():
     if settings.is_development():
         pool_settings.update({
             "echo": True,
-            "pool_size": 5,
-            "max_overflow": 10,
+            "pool_size": min(settings.db_pool_size, 5),
+            "max_overflow": min(settings.db_pool_overflow, 10),
         })
     
     try:
         engine = create_engine(
             settings.database_url,
             future=True,
+            # Batch INSERT executemany (including RETURNING) into multi-row VALUES statements
+            use_insertmanyvalues=True,
+            insertmanyvalues_page_size=1000,
+            # psycopg2: also batch executemany UPDATE/DELETE (e.g. the bulk Video stat updates) with execute_batch
+            executemany_mode="values_plus_batch",
             **pool_settings
         )
         
@@ -77,11 +87,16 @@ SessionLocal = sessionmaker(
 )
 
 
+# Built once; the engine's compiled-statement cache then serves every health tick
+_HEALTH_CHECK_STMT = text("SELECT 1")
+_PUBLIC_TABLES_STMT = text("SELECT table_name FROM information_schema.tables WHERE table_schema = 'public'")
+
+
 def check_database_health() -> bool:
     """Check if database is healthy and accessible."""
     try:
         with engine.connect() as connection:
-            result = connection.execute(text("SELECT 1"))
+            result = connection.execute(_HEALTH_CHECK_STMT)
             result.fetchone()
             return True
     except Exception as e:
@@ -92,7 +107,7 @@ def check_database_health() -> bool:
         return False
 
 
-def wait_for_database(max_retries: int = 30, retry_delay: float = 2.0) -> bool:
+def wait_for_database(max_retries: int = 10, retry_delay: float = 2.0) -> bool:
     """Wait for database to become available."""
     logger.info("Waiting for database to become available...")
     
@@ -101,11 +116,14 @@ def wait_for_database(max_retries: int = 30, retry_delay: float = 2.0) -> bool:
             logger.info("Database is available", extra={"attempts": attempt + 1})
             return True
         
-        logger.warning(f"Database not available, retrying in {retry_delay}s...", extra={
+        # Exponential backoff capped at 30s, with jitter so restarted workers don't retry in lockstep
+        delay = min(retry_delay * (2 ** attempt), 30.0)
+        delay += random.uniform(0, 0.5 * delay)
+        logger.warning(f"Database not available, retrying in {delay:.1f}s...", extra={
             "attempt": attempt + 1,
             "max_retries": max_retries
         })
-        time.sleep(retry_delay)
+        time.sleep(delay)
     
     logger.error("Database failed to become available", extra={"max_retries": max_retries})
     return False
@@ -113,7 +131,12 @@ def wait_for_database(max_retries: int = 30, retry_delay: float = 2.0) -> bool:
 
 @contextmanager
 def session_scope() -> Iterator:
-    """Provide a transactional scope around a series of operations."""
+    """Provide a transactional scope around a series of operations.
+    
+    Keep scopes short: never await Discord or other network calls inside one.
+    Do the DB work (from bot code, in a worker thread), let the scope commit,
+    then talk to Discord, so pooled connections are not held across awaits.
+    """
     session = SessionLocal()
     try:
         logger.debug("Database session started")
@@ -139,11 +162,115 @@ def session_scope() -> Iterator:
         logger.debug("Database session closed")
 
 
+@contextmanager
+def readonly_scope() -> Iterator:
+    """Provide an autocommit connection for pure SELECTs.
+
+    Skips the ORM session and the BEGIN/COMMIT pair, so each query is a
+    single round-trip. Never write through it; use ``session_scope`` for that.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        yield connection
+
+
 def get_session() -> SessionLocal:
     """Get a database session."""
     return SessionLocal()
 
 
+def bulk_upsert_monthly_views(session, rows: list[dict], chunk_size: int = 1000) -> dict[int, tuple[int, int]]:
+    """Insert or update monthly view rows in a single statement per chunk.
+
+    Each row carries ``user_id``, ``video_id``, ``year``, ``month``, ``views``,
+    ``views_change`` and ``updated_at``. When a row already exists for
+    ``(video_id, year, month)`` only the positive part of ``views_change`` is
+    added to the stored monthly total.
+
+    Returns ``{video_id: (views, views_change)}`` for every upserted row.
+    """
+    if not rows:
+        return {}
+
+    from app.models import MonthlyView
+
+    stmt = pg_insert(MonthlyView)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["video_id", "year", "month"],
+        set_={
+            "views": MonthlyView.views + func.greatest(stmt.excluded.views_change, 0),
+            "views_change": stmt.excluded.views_change,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    ).returning(MonthlyView.video_id, MonthlyView.views, MonthlyView.views_change)
+
+    upserted = {}
+    for start in range(0, len(rows), chunk_size):
+        for video_id, views, views_change in session.execute(stmt.values(rows[start:start + chunk_size])):
+            upserted[video_id] = (views, views_change)
+    return upserted
+
+
+def batch_fetch_users_by_discord_ids(session, discord_user_ids: list[int]) -> dict:
+    """Load the users for many Discord IDs in a single ``IN`` query.
+
+    Returns ``{discord_user_id: User}``; IDs without a user row are omitted.
+    """
+    if not discord_user_ids:
+        return {}
+
+    from app.models import User
+
+    users = session.execute(
+        select(User).where(User.discord_user_id.in_(set(discord_user_ids)))
+    ).scalars().all()
+    return {user.discord_user_id: user for user in users}
+
+
+def next_month(year: int, month: int) -> tuple[int, int]:
+    """Return the (year, month) after the given one."""
+    return (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+_PARTITIONED_CHECK_STMT = text(
+    "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('monthly_views'))"
+)
+_unpartitioned_warned = False
+
+
+def monthly_views_is_partitioned(connection) -> bool:
+    """Whether ``monthly_views`` is a partitioned table.
+
+    Databases created before partitioning keep a plain table until the
+    ``b063d89b3286`` Alembic revision converts it (``create_all`` never alters
+    an existing one); partition maintenance is skipped for them, with a single
+    warning per process.
+    """
+    global _unpartitioned_warned
+    if connection.execute(_PARTITIONED_CHECK_STMT).scalar():
+        return True
+    if not _unpartitioned_warned:
+        logger.warning("monthly_views is not partitioned, skipping partition maintenance until `alembic upgrade head` converts it")
+        _unpartitioned_warned = True
+    return False
+
+
+def ensure_monthly_views_partition(connection, year: int, month: int) -> bool:
+    """Create the ``monthly_views`` partition for one month if it does not exist yet.
+
+    Must run before that month's rows arrive: once the default partition holds
+    rows for the range, Postgres refuses to attach a dedicated partition.
+    Returns False (and creates nothing) when the table is not partitioned.
+    """
+    if not monthly_views_is_partitioned(connection):
+        return False
+    end_year, end_month = next_month(year, month)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS monthly_views_{year:04d}_{month:02d} "
+        f"PARTITION OF monthly_views FOR VALUES FROM ({year}, {month}) TO ({end_year}, {end_month})"
+    ))
+    return True
+
+
 def init_db():
     """Initialize database tables."""
     try:
@@ -155,13 +282,24 @@ def init_db():
         Base.metadata.create_all(bind=engine)
         logger.info("Database tables created successfully")
         
+        # Partitions for this month and the next; the daily partition task stays a month ahead after that
+        now = datetime.now(timezone.utc)
+        for year, month in ((now.year, now.month), next_month(now.year, now.month)):
+            try:
+                with engine.connect() as connection:
+                    ensure_monthly_views_partition(connection, year, month)
+                    connection.commit()
+            except SQLAlchemyError as e:
+                # e.g. rows for the month already sit in the default partition; they stay there
+                logger.warning("Could not create monthly_views partition", extra={
+                    "year": year,
+                    "month": month,
+                    "error": str(e)
+                })
+        
         # Verify tables were created
         with engine.connect() as connection:
-            tables = connection.execute(text("""
-                SELECT table_name 
-                FROM information_schema.tables 
-                WHERE table_schema = 'public'
-            """)).fetchall()
+            tables = connection.execute(_PUBLIC_TABLES_STMT).fetchall()
             
             table_names = [row[0] for row in tables]
             logger.info("Database tables verified", extra={"tables": table_names})
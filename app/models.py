@@ -1,20 +1,26 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import Optional
 
 from sqlalchemy import (
-    Column,
+    DDL,
     Integer,
+    BigInteger,
     String,
     DateTime,
     ForeignKey,
+    Identity,
     UniqueConstraint,
     Index,
     Boolean,
     Text,
+    text,
+    event,
+    func,
 )
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.orm import Mapped, configure_mappers, mapped_column, relationship
 
 from app.infrastructure.db import Base
 
@@ -22,24 +28,26 @@ from app.infrastructure.db import Base
 class User(Base):
     __tablename__ = "users"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    discord_user_id: Mapped[str] = mapped_column(String(64), unique=True, index=True)
+    id: Mapped[int] = mapped_column(BigInteger, Identity(always=True), primary_key=True)
+    discord_user_id: Mapped[int] = mapped_column(BigInteger, unique=True, index=True)  # Discord snowflake
     discord_username: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     paypal_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
     cashapp_id: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
 
-    channels: Mapped[list[Channel]] = relationship("Channel", back_populates="user", cascade="all, delete-orphan")
-    videos: Mapped[list[Video]] = relationship("Video", back_populates="user", cascade="all, delete-orphan")
-    monthly_views: Mapped[list[MonthlyView]] = relationship("MonthlyView", back_populates="user", cascade="all, delete-orphan")
+    # passive_deletes: the ON DELETE CASCADE foreign keys remove children, so deletes never load these collections
+    channels: Mapped[list[Channel]] = relationship("Channel", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    videos: Mapped[list[Video]] = relationship("Video", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
+    monthly_views: Mapped[list[MonthlyView]] = relationship("MonthlyView", back_populates="user", cascade="all, delete-orphan", passive_deletes=True)
 
 
 class Channel(Base):
     __tablename__ = "channels"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
-    channel_id: Mapped[str] = mapped_column(String(128), index=True)  # YouTube channel ID
+    id: Mapped[int] = mapped_column(BigInteger, Identity(always=True), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    # YouTube IDs are fixed-length ASCII; "C" collation makes index probes plain byte comparisons
+    channel_id: Mapped[str] = mapped_column(String(32, collation="C"), index=True)  # YouTube channel ID
     channel_name: Mapped[Optional[str]] = mapped_column(String(256), nullable=True)
     url: Mapped[str] = mapped_column(String(512))
     verification_code: Mapped[str] = mapped_column(String(16))
@@ -47,24 +55,26 @@ class Channel(Base):
     verification_mode: Mapped[str] = mapped_column(String(16), default="manual")  # manual|automatic
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     last_sync_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     user: Mapped[User] = relationship("User", back_populates="channels")
     videos: Mapped[list[Video]] = relationship("Video", back_populates="channel", cascade="all, delete-orphan")
 
     __table_args__ = (
         UniqueConstraint("channel_id", name="uq_channel_id"),
-        Index("ix_user_channel", "user_id", "channel_id"),
+        Index("ix_user_channel", "user_id", "channel_id", unique=True),
+        # Partial index for the sync tasks, which only ever read verified, active channels
+        Index("ix_channel_user_verified_active", "user_id", postgresql_where=text("is_verified AND is_active")),
     )
 
 
 class Video(Base):
     __tablename__ = "videos"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
-    channel_id: Mapped[Optional[int]] = mapped_column(ForeignKey("channels.id", ondelete="SET NULL"), nullable=True)
-    video_id: Mapped[str] = mapped_column(String(128), index=True)  # YouTube video ID
+    id: Mapped[int] = mapped_column(BigInteger, Identity(always=True), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    channel_id: Mapped[Optional[int]] = mapped_column(BigInteger, ForeignKey("channels.id", ondelete="SET NULL"), nullable=True)
+    video_id: Mapped[str] = mapped_column(String(16, collation="C"), index=True)  # YouTube video ID
     url: Mapped[str] = mapped_column(String(512))
     title: Mapped[Optional[str]] = mapped_column(String(512), nullable=True)
     description: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
@@ -72,40 +82,67 @@ class Video(Base):
     published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     last_view_count: Mapped[int] = mapped_column(Integer, default=0)
-    last_updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
-    created_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    last_updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     user: Mapped[User] = relationship("User", back_populates="videos")
     channel: Mapped[Optional[Channel]] = relationship("Channel", back_populates="videos")
-    monthly_views: Mapped[list[MonthlyView]] = relationship("MonthlyView", back_populates="video", cascade="all, delete-orphan")
+    monthly_views: Mapped[list[MonthlyView]] = relationship("MonthlyView", back_populates="video", cascade="all, delete-orphan", passive_deletes=True)
+
+    @hybrid_property
+    def display_title(self) -> str:
+        """Title shown to users, falling back to the YouTube video ID when the title is unknown"""
+        return self.title or f"Video {self.video_id}"
+
+    @display_title.inplace.expression
+    @classmethod
+    def _display_title_expression(cls):
+        return func.coalesce(cls.title, "Video " + cls.video_id)
 
     __table_args__ = (
         UniqueConstraint("video_id", name="uq_video_id"),
-        Index("ix_user_video", "user_id", "video_id"),
+        UniqueConstraint("user_id", "video_id", name="uq_video_user_videoid"),
         Index("ix_channel_video", "channel_id", "video_id"),
+        # Serves per-user "top videos by views" ORDER BY ... LIMIT queries
+        Index("ix_video_user_views", "user_id", text("last_view_count DESC")),
     )
 
 
 class MonthlyView(Base):
     __tablename__ = "monthly_views"
 
-    id: Mapped[int] = mapped_column(Integer, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), index=True)
-    video_id: Mapped[int] = mapped_column(ForeignKey("videos.id", ondelete="CASCADE"), index=True)
-    year: Mapped[int] = mapped_column(Integer)
-    month: Mapped[int] = mapped_column(Integer)
+    id: Mapped[int] = mapped_column(BigInteger, Identity(always=True), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    video_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("videos.id", ondelete="CASCADE"), index=True)
+    # Part of the primary key because Postgres requires the partition key in every unique constraint
+    year: Mapped[int] = mapped_column(Integer, primary_key=True)
+    month: Mapped[int] = mapped_column(Integer, primary_key=True)
     views: Mapped[int] = mapped_column(Integer, default=0)
     views_change: Mapped[int] = mapped_column(Integer, default=0)  # Change from previous update
-    updated_at: Mapped[datetime] = mapped_column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
     user: Mapped[User] = relationship("User", back_populates="monthly_views")
     video: Mapped[Video] = relationship("Video", back_populates="monthly_views")
 
     __table_args__ = (
         UniqueConstraint("video_id", "year", "month", name="uq_video_year_month"),
-        Index("ix_user_year_month", "user_id", "year", "month"),
-        Index("ix_video_year_month", "video_id", "year", "month"),
+        # Covering indexes: trailing video_id and the INCLUDEd view counts let per-user and
+        # per-video period lookups and SUM aggregates run as index-only scans
+        Index("ix_user_year_month", "user_id", "year", "month", "video_id", postgresql_include=["views", "views_change"]),
+        Index("ix_video_year_month", "video_id", "year", "month", postgresql_include=["views", "views_change"]),
+        # One partition per month (see ensure_monthly_views_partition); queries on a period prune to it
+        {"postgresql_partition_by": "RANGE (year, month)"},
     )
 
 
+# Catch-all partition so inserts never fail for a month whose partition has not been created yet
+event.listen(
+    MonthlyView.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS monthly_views_default PARTITION OF monthly_views DEFAULT").execute_if(dialect="postgresql"),
+)
+
+
+# Resolve relationships now rather than on the first query
+configure_mappers()
@@ -0,0 +1,34 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Optional
+
+import aiohttp
+
+# Shared HTTP session so API calls reuse warm connections to googleapis.com
+_http_session: Optional[aiohttp.ClientSession] = None
+_http_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# Upper bound on concurrent outbound connections per event loop
+HTTP_CONNECTION_LIMIT = 20
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session for the running event loop, creating it if needed"""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=HTTP_CONNECTION_LIMIT, ttl_dns_cache=300, keepalive_timeout=60)
+        )
+        _http_session_loop = loop
+    return _http_session
+
+
+async def close_http_session() -> None:
+    """Close the shared aiohttp session"""
+    global _http_session, _http_session_loop
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+    _http_session_loop = None
@@ -1,13 +1,13 @@
 from __future__ import annotations
 
 import time
+import random
 import asyncio
-from datetime import datetime, timezone, timedelta
-from typing import Optional, Dict, Any
-from dataclasses import dataclass, field
+from typing import Dict, Any, Optional
+from dataclasses import dataclass
 from enum import Enum
 
-from app.infrastructure.cache import cache_get_json, cache_set_json, get_redis
+from app.infrastructure.cache import cache_get_counters, cache_incr_counters, cache_run_script
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -24,14 +24,10 @@ class QuotaType(Enum):
 
 @dataclass
 class QuotaUsage:
-    """Track quota usage over time"""
-    total_quota_used: int = 0
+    """Quota counters for one daily or hourly window"""
+    quota_used: int = 0
     requests_made: int = 0
-    last_reset_time: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    daily_quota_used: int = 0
-    hourly_quota_used: int = 0
     errors_count: int = 0
-    rate_limited_count: int = 0
 
 
 @dataclass
@@ -47,255 +43,328 @@ class QuotaLimits:
     HOURLY_WARNING_THRESHOLD = 800   # 80% of hourly limit
 
 
+# Queued quota records: bounded so a stalled Redis applies backpressure instead of growing memory
+RECORD_QUEUE_SIZE = 1000
+RECORD_BATCH_SIZE = 100
+
+RATE_BUCKET_KEY = "yt:ratelimit:buckets"
+
+# How long wait_if_needed keeps waiting for a rate-limit token before giving up on a request
+RATE_LIMIT_MAX_WAIT_SECONDS = 30.0
+
+# Two token buckets shared by every worker, kept as (minute tokens, second tokens, last refill) in one hash.
+# Both refill continuously up to their limit; a request is allowed when each holds a whole token,
+# and (with take=1) spends one from each. O(1) state, no per-request history.
+# ARGV: now, per-minute limit, per-second limit, take (1 to spend, 0 to only look).
+_RATE_BUCKET_SCRIPT = """
+local key = KEYS[1]
+local now = tonumber(ARGV[1])
+local per_minute = tonumber(ARGV[2])
+local per_second = tonumber(ARGV[3])
+local state = redis.call('HMGET', key, 'minute', 'second', 'ts')
+local elapsed = math.max(0, now - (tonumber(state[3]) or now))
+local minute = math.min(per_minute, (tonumber(state[1]) or per_minute) + elapsed * per_minute / 60)
+local second = math.min(per_second, (tonumber(state[2]) or per_second) + elapsed * per_second)
+local allowed = 0
+if minute >= 1 and second >= 1 then
+    allowed = 1
+    if ARGV[4] == '1' then
+        minute = minute - 1
+        second = second - 1
+    end
+end
+redis.call('HSET', key, 'minute', minute, 'second', second, 'ts', now)
+redis.call('EXPIRE', key, 60)
+return {allowed, tostring(minute), tostring(second)}
+"""
+
+
 class QuotaManager:
     """Manages YouTube API quota usage with intelligent rate limiting"""
     
+    _TIMEFRAME_TTLS = {"daily": 86400, "hourly": 3600}  # 24h or 1h
+    _LOCAL_CACHE_TTL = 0.25  # Seconds a counter read is reused in-process; negligible against 1h/24h windows
+    
     def __init__(self):
-        self.redis = get_redis()
         self.limits = QuotaLimits()
-        self._request_times: list[float] = []
-        self._last_request_time = 0.0
-        
-    def _get_cache_key(self, timeframe: str) -> str:
-        """Get cache key for quota tracking"""
-        return f"youtube_quota:{timeframe}"
-    
-    def _get_current_usage(self, timeframe: str) -> QuotaUsage:
-        """Get current quota usage for timeframe"""
-        cache_key = self._get_cache_key(timeframe)
-        cached = cache_get_json(cache_key)
-        
-        if cached:
-            # Convert datetime strings back to datetime objects
-            if cached.get("last_reset_time"):
-                cached["last_reset_time"] = datetime.fromisoformat(cached["last_reset_time"])
-            return QuotaUsage(**cached)
-        
-        return QuotaUsage()
+        # Per-process memo of "used" counters: key -> (read at, value)
+        self._local_cache: dict[str, tuple[float, int]] = {}
+        # Background writer for record_request; started lazily on the running event loop
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # Bucket levels as of the last check, used to pace the next request
+        self._minute_tokens = float(self.limits.REQUESTS_PER_MINUTE)
+        self._second_tokens = float(self.limits.REQUESTS_PER_SECOND)
+        
+    def _check_rate_buckets(self, now: float, take: bool) -> tuple[bool, float, float]:
+        """Refill the shared token buckets and report whether a request may go; with take=True spend a token.
+        
+        Returns (allowed, minute tokens left, second tokens left). Fails open when Redis is unavailable.
+        """
+        result = cache_run_script(
+            _RATE_BUCKET_SCRIPT,
+            [RATE_BUCKET_KEY],
+            [now, self.limits.REQUESTS_PER_MINUTE, self.limits.REQUESTS_PER_SECOND, int(take)],
+        )
+        if result is None:
+            return True, float(self.limits.REQUESTS_PER_MINUTE), float(self.limits.REQUESTS_PER_SECOND)
+        allowed, minute_tokens, second_tokens = result
+        self._minute_tokens, self._second_tokens = float(minute_tokens), float(second_tokens)
+        return bool(allowed), self._minute_tokens, self._second_tokens
     
-    def _save_usage(self, usage: QuotaUsage, timeframe: str, ttl: int) -> None:
-        """Save quota usage to cache"""
-        cache_key = self._get_cache_key(timeframe)
+    @staticmethod
+    def _get_window_keys(now: float) -> dict[str, str]:
+        """Get the key prefix of the current daily and hourly window.
         
-        # Convert datetime to string for JSON serialization
-        usage_dict = {
-            "total_quota_used": usage.total_quota_used,
-            "requests_made": usage.requests_made,
-            "last_reset_time": usage.last_reset_time.isoformat(),
-            "daily_quota_used": usage.daily_quota_used,
-            "hourly_quota_used": usage.hourly_quota_used,
-            "errors_count": usage.errors_count,
-            "rate_limited_count": usage.rate_limited_count
+        Keys are stamped with the integer UTC day/hour since the epoch, so a new window
+        starts from fresh counters and the old ones expire on their own - nothing needs resetting.
+        """
+        return {
+            "daily": f"yt:quota:daily:{int(now // 86400)}",
+            "hourly": f"yt:quota:hourly:{int(now // 3600)}",
         }
-        
-        cache_set_json(cache_key, usage_dict, ttl)
     
-    def _should_reset_timeframe(self, usage: QuotaUsage, timeframe: str) -> bool:
-        """Check if timeframe should be reset"""
-        now = datetime.now(timezone.utc)
+    def _get_used_counters(self, now: float, keys: list[str]) -> list[int]:
+        """Read "used" counters, collapsing bursts of checks within _LOCAL_CACHE_TTL into one MGET"""
+        entries = [self._local_cache.get(key) for key in keys]
+        if all(entry and now - entry[0] < self._LOCAL_CACHE_TTL for entry in entries):
+            return [entry[1] for entry in entries]
+        
+        values = cache_get_counters(keys)
+        # Rebuilt rather than updated so keys of past windows drop out
+        self._local_cache = {key: (now, value) for key, value in zip(keys, values)}
+        return values
+    
+    def _check_quota_windows(self, now: float, quota_cost: int) -> tuple[bool, str]:
+        """Check the daily and hourly quota windows for a request with given quota cost"""
+        # Both windows' usage in one MGET
+        window_keys = self._get_window_keys(now)
+        daily_used, hourly_used = self._get_used_counters(now, [f"{window_keys['daily']}:used", f"{window_keys['hourly']}:used"])
         
-        if timeframe == "daily":
-            return now.date() > usage.last_reset_time.date()
-        elif timeframe == "hourly":
-            return now.hour != usage.last_reset_time.hour
+        # Check daily limit
+        if daily_used + quota_cost > self.limits.DAILY_QUOTA_LIMIT:
+            return False, f"Daily quota limit exceeded ({daily_used}/{self.limits.DAILY_QUOTA_LIMIT})"
         
-        return False
+        # Check hourly limit
+        if hourly_used + quota_cost > self.limits.HOURLY_QUOTA_LIMIT:
+            return False, f"Hourly quota limit exceeded ({hourly_used}/{self.limits.HOURLY_QUOTA_LIMIT})"
+        
+        return True, "OK"
     
-    def _reset_timeframe_if_needed(self, timeframe: str) -> QuotaUsage:
-        """Reset quota usage if timeframe has passed"""
-        usage = self._get_current_usage(timeframe)
+    def _take_rate_token(self, now: float) -> tuple[bool, str]:
+        """Spend a rate-limit token if both buckets hold one"""
+        allowed, minute_tokens, _ = self._check_rate_buckets(now, take=True)
         
-        if self._should_reset_timeframe(usage, timeframe):
-            logger.info(f"Resetting {timeframe} quota usage", extra={
-                "previous_usage": usage.total_quota_used,
-                "requests_made": usage.requests_made
-            })
-            
-            # Reset usage for new timeframe
-            usage = QuotaUsage()
-            
-            # Save reset usage
-            ttl = 86400 if timeframe == "daily" else 3600  # 24h or 1h
-            self._save_usage(usage, timeframe, ttl)
+        if not allowed:
+            if minute_tokens < 1:
+                return False, f"Rate limit exceeded ({self.limits.REQUESTS_PER_MINUTE} requests per minute)"
+            # Burst protection
+            return False, f"Burst limit exceeded ({self.limits.REQUESTS_PER_SECOND} requests per second)"
         
-        return usage
+        return True, "OK"
     
     async def check_quota_availability(self, quota_cost: int) -> tuple[bool, str]:
         """Check if we can make a request with given quota cost"""
         
-        # Reset timeframes if needed
-        daily_usage = self._reset_timeframe_if_needed("daily")
-        hourly_usage = self._reset_timeframe_if_needed("hourly")
-        
-        # Check daily limit
-        if daily_usage.daily_quota_used + quota_cost > self.limits.DAILY_QUOTA_LIMIT:
-            return False, f"Daily quota limit exceeded ({daily_usage.daily_quota_used}/{self.limits.DAILY_QUOTA_LIMIT})"
-        
-        # Check hourly limit
-        if hourly_usage.hourly_quota_used + quota_cost > self.limits.HOURLY_QUOTA_LIMIT:
-            return False, f"Hourly quota limit exceeded ({hourly_usage.hourly_quota_used}/{self.limits.HOURLY_QUOTA_LIMIT})"
-        
-        # Check rate limiting
         now = time.time()
         
-        # Remove old request times (older than 1 minute)
-        self._request_times = [t for t in self._request_times if now - t < 60]
-        
-        # Check requests per minute
-        if len(self._request_times) >= self.limits.REQUESTS_PER_MINUTE:
-            return False, f"Rate limit exceeded ({len(self._request_times)}/{self.limits.REQUESTS_PER_MINUTE} requests per minute)"
-        
-        # Check requests per second (burst protection)
-        recent_requests = [t for t in self._request_times if now - t < 1.0]
-        if len(recent_requests) >= self.limits.REQUESTS_PER_SECOND:
-            return False, f"Burst limit exceeded ({len(recent_requests)}/{self.limits.REQUESTS_PER_SECOND} requests per second)"
+        can_proceed, reason = self._check_quota_windows(now, quota_cost)
+        if not can_proceed:
+            return can_proceed, reason
         
-        return True, "OK"
+        # Check rate limiting; an allowed request spends its tokens atomically
+        return self._take_rate_token(now)
     
     async def get_required_delay(self) -> float:
         """Calculate required delay before next request"""
-        now = time.time()
-        
-        # Minimum delay between requests (200ms)
-        min_delay = 0.2
-        time_since_last = now - self._last_request_time
-        
-        if time_since_last < min_delay:
-            return min_delay - time_since_last
-        
-        # Additional delay if we're approaching rate limits
-        self._request_times = [t for t in self._request_times if now - t < 60]
-        
-        if len(self._request_times) > self.limits.REQUESTS_PER_MINUTE * 0.8:  # 80% of limit
-            return 1.0  # 1 second delay
-        elif len(self._request_times) > self.limits.REQUESTS_PER_MINUTE * 0.6:  # 60% of limit
-            return 0.5  # 500ms delay
-        
-        return 0.0
+        # Time until both buckets hold a whole token again, as of the last check
+        return max(
+            0.0,
+            (1 - self._minute_tokens) / (self.limits.REQUESTS_PER_MINUTE / 60),
+            (1 - self._second_tokens) / self.limits.REQUESTS_PER_SECOND,
+        )
+    
+    def _ensure_writer(self) -> asyncio.Queue:
+        """Start the record writer on the running event loop if it isn't running there yet.
+        
+        Celery tasks run each batch under its own asyncio.run(), so a writer bound
+        to an earlier (closed) loop is replaced rather than reused.
+        """
+        loop = asyncio.get_running_loop()
+        if self._writer_task is None or self._writer_task.done() or self._writer_task.get_loop() is not loop:
+            self._write_queue = asyncio.Queue(maxsize=RECORD_QUEUE_SIZE)
+            self._writer_task = loop.create_task(self._writer_loop(self._write_queue))
+        return self._write_queue
     
     async def record_request(self, quota_type: QuotaType, success: bool = True) -> None:
-        """Record an API request and its quota usage"""
+        """Queue an API request's quota usage for the background writer and return immediately"""
+        await self._ensure_writer().put((quota_type, success, time.time()))
+    
+    async def flush(self) -> None:
+        """Wait until every queued record on this event loop has been written"""
+        task = self._writer_task
+        if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+            await self._write_queue.join()
+    
+    async def _writer_loop(self, queue: asyncio.Queue) -> None:
+        """Drain queued records in batches, writing each batch in one pipelined round-trip"""
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < RECORD_BATCH_SIZE:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                # Blocking Redis I/O stays off the event loop
+                await asyncio.to_thread(self._write_records, batch)
+            except Exception as e:
+                logger.error("Failed to record YouTube API requests", extra={
+                    "batch_size": len(batch),
+                    "error": str(e),
+                    "error_type": type(e).__name__
+                })
+            finally:
+                for _ in batch:
+                    queue.task_done()
+    
+    def _write_records(self, batch: list[tuple[QuotaType, bool, float]]) -> None:
+        """Aggregate a batch of records into per-window INCRBY totals and apply them atomically"""
+        increments: dict[str, tuple[int, int]] = {}
+        
+        def add(key: str, amount: int, ttl: int) -> None:
+            total, _ = increments.get(key, (0, ttl))
+            increments[key] = (total + amount, ttl)
+        
+        for quota_type, success, recorded_at in batch:
+            for timeframe, key in self._get_window_keys(recorded_at).items():
+                ttl = self._TIMEFRAME_TTLS[timeframe]
+                add(f"{key}:used", quota_type.value, ttl)
+                add(f"{key}:requests", 1, ttl)
+                if not success:
+                    add(f"{key}:errors", 1, ttl)
+        
+        counters = cache_incr_counters(increments)
         now = time.time()
-        quota_cost = quota_type.value
-        
-        # Record request time
-        self._request_times.append(now)
-        self._last_request_time = now
-        
-        # Update daily usage
-        daily_usage = self._get_current_usage("daily")
-        daily_usage.total_quota_used += quota_cost
-        daily_usage.daily_quota_used += quota_cost
-        daily_usage.requests_made += 1
-        
-        if not success:
-            daily_usage.errors_count += 1
-        
-        self._save_usage(daily_usage, "daily", 86400)
-        
-        # Update hourly usage
-        hourly_usage = self._get_current_usage("hourly")
-        hourly_usage.total_quota_used += quota_cost
-        hourly_usage.hourly_quota_used += quota_cost
-        hourly_usage.requests_made += 1
-        
-        if not success:
-            hourly_usage.errors_count += 1
-        
-        self._save_usage(hourly_usage, "hourly", 3600)
+        window_keys = self._get_window_keys(now)
+        daily_used = counters.get(f"{window_keys['daily']}:used", 0)
+        hourly_used = counters.get(f"{window_keys['hourly']}:used", 0)
+        
+        # INCRBY returned the new totals, so refresh the memo instead of leaving it stale
+        if counters:
+            self._local_cache = {
+                f"{window_keys['daily']}:used": (now, daily_used),
+                f"{window_keys['hourly']}:used": (now, hourly_used),
+            }
+        else:
+            self._local_cache.clear()
         
         # Log quota usage
-        logger.info("YouTube API request recorded", extra={
-            "quota_type": quota_type.name,
-            "quota_cost": quota_cost,
-            "success": success,
-            "daily_quota_used": daily_usage.daily_quota_used,
-            "hourly_quota_used": hourly_usage.hourly_quota_used,
-            "requests_made_today": daily_usage.requests_made
+        logger.info("YouTube API requests recorded", extra={
+            "requests": len(batch),
+            "quota_cost": sum(quota_type.value for quota_type, _, _ in batch),
+            "errors": sum(not success for _, success, _ in batch),
+            "daily_quota_used": daily_used,
+            "hourly_quota_used": hourly_used,
+            "requests_made_today": counters.get(f"{window_keys['daily']}:requests", 0)
         })
         
         # Check warning thresholds
-        await self._check_warning_thresholds(daily_usage, hourly_usage)
+        self._check_warning_thresholds(daily_used, hourly_used)
     
-    async def _check_warning_thresholds(self, daily_usage: QuotaUsage, hourly_usage: QuotaUsage) -> None:
+    def _check_warning_thresholds(self, daily_used: int, hourly_used: int) -> None:
         """Check if we're approaching quota limits and log warnings"""
         
         # Daily quota warning
-        if daily_usage.daily_quota_used >= self.limits.DAILY_WARNING_THRESHOLD:
-            if daily_usage.daily_quota_used < self.limits.DAILY_QUOTA_LIMIT:
+        if daily_used >= self.limits.DAILY_WARNING_THRESHOLD:
+            if daily_used < self.limits.DAILY_QUOTA_LIMIT:
                 logger.warning("Daily quota warning threshold reached", extra={
-                    "quota_used": daily_usage.daily_quota_used,
+                    "quota_used": daily_used,
                     "quota_limit": self.limits.DAILY_QUOTA_LIMIT,
-                    "percentage": round((daily_usage.daily_quota_used / self.limits.DAILY_QUOTA_LIMIT) * 100, 1)
+                    "percentage": round((daily_used / self.limits.DAILY_QUOTA_LIMIT) * 100, 1)
                 })
         
         # Hourly quota warning  
-        if hourly_usage.hourly_quota_used >= self.limits.HOURLY_WARNING_THRESHOLD:
-            if hourly_usage.hourly_quota_used < self.limits.HOURLY_QUOTA_LIMIT:
+        if hourly_used >= self.limits.HOURLY_WARNING_THRESHOLD:
+            if hourly_used < self.limits.HOURLY_QUOTA_LIMIT:
                 logger.warning("Hourly quota warning threshold reached", extra={
-                    "quota_used": hourly_usage.hourly_quota_used,
+                    "quota_used": hourly_used,
                     "quota_limit": self.limits.HOURLY_QUOTA_LIMIT,
-                    "percentage": round((hourly_usage.hourly_quota_used / self.limits.HOURLY_QUOTA_LIMIT) * 100, 1)
+                    "percentage": round((hourly_used / self.limits.HOURLY_QUOTA_LIMIT) * 100, 1)
                 })
     
     async def get_quota_status(self) -> Dict[str, Any]:
         """Get current quota status"""
-        daily_usage = self._reset_timeframe_if_needed("daily")
-        hourly_usage = self._reset_timeframe_if_needed("hourly")
-        
         now = time.time()
-        self._request_times = [t for t in self._request_times if now - t < 60]
+        window_keys = self._get_window_keys(now)
+        counts = cache_get_counters([
+            f"{window_keys[timeframe]}:{counter}"
+            for timeframe in ("daily", "hourly")
+            for counter in ("used", "requests", "errors")
+        ])
+        daily_usage, hourly_usage = QuotaUsage(*counts[:3]), QuotaUsage(*counts[3:])
+        
+        _, minute_tokens, second_tokens = self._check_rate_buckets(now, take=False)
         
         return {
             "daily": {
-                "used": daily_usage.daily_quota_used,
+                "used": daily_usage.quota_used,
                 "limit": self.limits.DAILY_QUOTA_LIMIT,
-                "remaining": self.limits.DAILY_QUOTA_LIMIT - daily_usage.daily_quota_used,
-                "percentage": round((daily_usage.daily_quota_used / self.limits.DAILY_QUOTA_LIMIT) * 100, 1),
+                "remaining": self.limits.DAILY_QUOTA_LIMIT - daily_usage.quota_used,
+                "percentage": round((daily_usage.quota_used / self.limits.DAILY_QUOTA_LIMIT) * 100, 1),
                 "requests_made": daily_usage.requests_made,
                 "errors": daily_usage.errors_count
             },
             "hourly": {
-                "used": hourly_usage.hourly_quota_used,
+                "used": hourly_usage.quota_used,
                 "limit": self.limits.HOURLY_QUOTA_LIMIT,
-                "remaining": self.limits.HOURLY_QUOTA_LIMIT - hourly_usage.hourly_quota_used,
-                "percentage": round((hourly_usage.hourly_quota_used / self.limits.HOURLY_QUOTA_LIMIT) * 100, 1),
+                "remaining": self.limits.HOURLY_QUOTA_LIMIT - hourly_usage.quota_used,
+                "percentage": round((hourly_usage.quota_used / self.limits.HOURLY_QUOTA_LIMIT) * 100, 1),
                 "requests_made": hourly_usage.requests_made,
                 "errors": hourly_usage.errors_count
             },
             "rate_limiting": {
-                "requests_last_minute": len(self._request_times),
+                "tokens_per_minute": round(minute_tokens, 1),
                 "limit_per_minute": self.limits.REQUESTS_PER_MINUTE,
-                "requests_last_second": len([t for t in self._request_times if now - t < 1.0]),
+                "tokens_per_second": round(second_tokens, 1),
                 "limit_per_second": self.limits.REQUESTS_PER_SECOND
             }
         }
     
     async def wait_if_needed(self, quota_type: QuotaType) -> bool:
-        """Wait if needed before making request. Returns True if request can proceed."""
+        """Wait if needed before making request. Returns True if request can proceed.
+        
+        Exhausted quota windows reject the request straight away; an empty rate-limit
+        bucket is waited out for up to RATE_LIMIT_MAX_WAIT_SECONDS.
+        """
         quota_cost = quota_type.value
         
         # Check quota availability
-        can_proceed, reason = await self.check_quota_availability(quota_cost)
-        
-        if not can_proceed:
-            logger.warning("YouTube API request blocked", extra={
-                "quota_type": quota_type.name,
-                "quota_cost": quota_cost,
-                "reason": reason
-            })
-            return False
-        
-        # Apply intelligent delay
-        delay = await self.get_required_delay()
-        if delay > 0:
-            logger.debug("Applying API rate limiting delay", extra={
-                "delay_seconds": delay,
-                "quota_type": quota_type.name
-            })
-            await asyncio.sleep(delay)
+        can_proceed, reason = self._check_quota_windows(time.time(), quota_cost)
+        
+        if can_proceed:
+            deadline = time.time() + RATE_LIMIT_MAX_WAIT_SECONDS
+            while True:
+                can_proceed, reason = self._take_rate_token(time.time())
+                if can_proceed:
+                    return True
+                
+                # Sleep until the buckets refill; the jitter keeps concurrent waiters from waking together
+                delay = await self.get_required_delay() + random.uniform(0, 1 / self.limits.REQUESTS_PER_SECOND)
+                if time.time() + delay > deadline:
+                    break
+                logger.debug("Applying API rate limiting delay", extra={
+                    "delay_seconds": delay,
+                    "quota_type": quota_type.name
+                })
+                await asyncio.sleep(delay)
         
-        return True
+        logger.warning("YouTube API request blocked", extra={
+            "quota_type": quota_type.name,
+            "quota_cost": quota_cost,
+            "reason": reason
+        })
+        return False
 
 
 # Global quota manager instance
@@ -10,8 +10,10 @@ from datetime import datetime
 import requests
 from requests.exceptions import RequestException, Timeout
 
-from app.config import settings
-from app.infrastructure.cache import cache_get_json, cache_set_json
+from app.config import get_settings
+from app.dto import VideoStatsDTO
+from app.infrastructure.cache import cache_get_json, cache_get_typed, cache_set_json, cache_mget_typed, cache_mset_json
+from app.services.http import get_http_session, close_http_session
 from app.services.quota_manager import quota_manager, QuotaType
 from app.utils.logger import get_logger
 
@@ -157,8 +159,55 @@ def parse_channel_id(url: str) -> Optional[str]:
     return None
 
 
+# Handle/video -> channel ID mappings practically never change, cache them for a day
+CHANNEL_LOOKUP_CACHE_TTL = 86400
+
+# Per-username locks so concurrent lookups of the same handle share one API call
+_username_lookup_locks: dict[str, asyncio.Lock] = {}
+# Number of callers holding or waiting on each lock, so it is only dropped once unused
+_username_lookup_users: dict[str, int] = {}
+
+
+def _normalize_username(username: str) -> str:
+    """Strip whitespace, a leading @ and any trailing path or query from a handle"""
+    # Clean the username
+    username = username.strip()
+    
+    # Remove @ symbol if present
+    if username.startswith('@'):
+        username = username[1:]
+    
+    # Remove any trailing slashes or parameters
+    return username.split('/')[0].split('?')[0].split('&')[0]
+
+
+def _get_cached_channel_id(cache_key: str) -> Optional[str]:
+    cached = cache_get_json(cache_key)
+    if cached and cached.get("channel_id"):
+        logger.info("Retrieved channel ID from cache", extra={"cache_key": cache_key})
+        return cached["channel_id"]
+    return None
+
+
 def get_channel_id_from_username(username: str) -> Optional[str]:
+    """Convert YouTube username/handle to channel ID, caching resolved IDs"""
+    if not username:
+        return None
+    
+    cache_key = f"youtube:username:{_normalize_username(username)}"
+    channel_id = _get_cached_channel_id(cache_key)
+    if channel_id:
+        return channel_id
+    
+    channel_id = _lookup_channel_id_from_username(username)
+    if channel_id:
+        cache_set_json(cache_key, {"channel_id": channel_id}, CHANNEL_LOOKUP_CACHE_TTL)
+    return channel_id
+
+
+def _lookup_channel_id_from_username(username: str) -> Optional[str]:
     """Convert YouTube username/handle to channel ID using API with enhanced flexibility"""
+    settings = get_settings()
     if not username or not settings.youtube_api_key:
         logger.warning("Missing username or YouTube API key for channel ID lookup", extra={
             "username": username,
@@ -166,15 +215,7 @@ def get_channel_id_from_username(username: str) -> Optional[str]:
         })
         return None
     
-    # Clean the username
-    username = username.strip()
-    
-    # Remove @ symbol if present
-    if username.startswith('@'):
-        username = username[1:]
-    
-    # Remove any trailing slashes or parameters
-    username = username.split('/')[0].split('?')[0].split('&')[0]
+    username = _normalize_username(username)
     
     logger.info("Looking up channel ID for username", extra={"username": username})
     
@@ -277,8 +318,62 @@ def get_channel_id_from_username(username: str) -> Optional[str]:
     return None
 
 
+# Cache video stats for 2 hours (extended from 5 minutes to reduce API calls)
+VIDEO_STATS_CACHE_TTL = 7200
+
+
+def _video_stats_from_cache(video_id: str, cached: Optional[VideoStatsDTO]) -> Optional[YouTubeVideoStats]:
+    """Rebuild stats from a typed cache entry, or None on a miss"""
+    if cached is None:
+        return None
+    stats = YouTubeVideoStats(
+        video_id=cached.video_id,
+        title=cached.title,
+        description=cached.description,
+        thumbnail_url=cached.thumbnail_url,
+        published_at=cached.published_at,
+        view_count=cached.view_count,
+        like_count=cached.like_count,
+        comment_count=cached.comment_count,
+    )
+    logger.info("Retrieved video stats from cache", extra={
+        "video_id": video_id,
+        "view_count": stats.view_count
+    })
+    return stats
+
+
+def _video_stats_cache_entry(stats: YouTubeVideoStats) -> VideoStatsDTO:
+    return VideoStatsDTO(
+        video_id=stats.video_id,
+        title=stats.title,
+        description=stats.description,
+        thumbnail_url=stats.thumbnail_url,
+        published_at=stats.published_at,
+        view_count=stats.view_count,
+        like_count=stats.like_count,
+        comment_count=stats.comment_count,
+    )
+
+
+def _get_cached_video_stats(video_id: str) -> Optional[YouTubeVideoStats]:
+    """Return cached stats for a video, or None on a miss or corrupted entry"""
+    return _video_stats_from_cache(video_id, cache_get_typed(f"youtube:video:{video_id}", VideoStatsDTO))
+
+
+def _cache_video_stats(stats: YouTubeVideoStats) -> None:
+    try:
+        cache_set_json(f"youtube:video:{stats.video_id}", _video_stats_cache_entry(stats), VIDEO_STATS_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Failed to cache video stats", extra={
+            "video_id": stats.video_id,
+            "error": str(e)
+        })
+
+
 async def fetch_video_stats_async(video_id: str) -> Optional[YouTubeVideoStats]:
     """Fetch video statistics from YouTube API with quota management and caching"""
+    settings = get_settings()
     if not video_id or not settings.youtube_api_key:
         logger.warning("Missing video ID or YouTube API key", extra={
             "video_id": video_id,
@@ -286,27 +381,10 @@ async def fetch_video_stats_async(video_id: str) -> Optional[YouTubeVideoStats]:
         })
         return None
     
-    cache_key = f"youtube:video:{video_id}"
-    
     # Check cache first
-    cached = cache_get_json(cache_key)
-    if cached:
-        try:
-            # Handle datetime conversion from cache
-            if cached.get("published_at"):
-                cached["published_at"] = datetime.fromisoformat(cached["published_at"])
-            stats = YouTubeVideoStats(**cached)
-            logger.info("Retrieved video stats from cache", extra={
-                "video_id": video_id,
-                "view_count": stats.view_count
-            })
-            return stats
-        except Exception as e:
-            logger.warning("Failed to parse cached video stats", extra={
-                "video_id": video_id,
-                "error": str(e)
-            })
-            # If cache is corrupted, continue to fetch fresh data
+    stats = _get_cached_video_stats(video_id)
+    if stats:
+        return stats
     
     # Check quota and wait if needed
     if not await quota_manager.wait_if_needed(QuotaType.VIDEO_STATS):
@@ -323,77 +401,61 @@ async def fetch_video_stats_async(video_id: str) -> Optional[YouTubeVideoStats]:
     
     success = False
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://www.googleapis.com/youtube/v3/videos", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                if resp.status != 200:
-                    logger.error("YouTube API request failed", extra={
-                        "video_id": video_id,
-                        "status_code": resp.status
-                    })
-                    await quota_manager.record_request(QuotaType.VIDEO_STATS, success=False)
-                    return None
-                
-                data = await resp.json()
-                items = data.get("items", [])
-                if not items:
-                    logger.warning("Video not found in YouTube API response", extra={"video_id": video_id})
-                    await quota_manager.record_request(QuotaType.VIDEO_STATS, success=False)
-                    return None
-                
-                item = items[0]
-                snippet = item.get("snippet", {})
-                statistics = item.get("statistics", {})
-                
-                # Parse published date
-                published_at = None
-                if snippet.get("publishedAt"):
-                    try:
-                        published_at = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
-                    except ValueError as e:
-                        logger.warning("Failed to parse published date", extra={
-                            "video_id": video_id,
-                            "published_at": snippet["publishedAt"],
-                            "error": str(e)
-                        })
-                
-                stats = YouTubeVideoStats(
-                    video_id=video_id,
-                    title=snippet.get("title"),
-                    description=snippet.get("description"),
-                    thumbnail_url=snippet.get("thumbnails", {}).get("medium", {}).get("url"),
-                    published_at=published_at,
-                    view_count=int(statistics.get("viewCount", 0)),
-                    like_count=int(statistics.get("likeCount", 0)),
-                    comment_count=int(statistics.get("commentCount", 0))
-                )
-                success = True
-        
-                logger.info("Successfully fetched video stats", extra={
+        session = get_http_session()
+        async with session.get("https://www.googleapis.com/youtube/v3/videos", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            if resp.status != 200:
+                logger.error("YouTube API request failed", extra={
                     "video_id": video_id,
-                    "title": stats.title,
-                    "view_count": stats.view_count,
-                    "like_count": stats.like_count
+                    "status_code": resp.status
                 })
-                
-                # Cache for 2 hours (extended from 5 minutes to reduce API calls)
+                await quota_manager.record_request(QuotaType.VIDEO_STATS, success=False)
+                return None
+            
+            data = await resp.json()
+            items = data.get("items", [])
+            if not items:
+                logger.warning("Video not found in YouTube API response", extra={"video_id": video_id})
+                await quota_manager.record_request(QuotaType.VIDEO_STATS, success=False)
+                return None
+            
+            item = items[0]
+            snippet = item.get("snippet", {})
+            statistics = item.get("statistics", {})
+            
+            # Parse published date
+            published_at = None
+            if snippet.get("publishedAt"):
                 try:
-                    cache_set_json(cache_key, {
-                        "video_id": stats.video_id,
-                        "title": stats.title,
-                        "description": stats.description,
-                        "thumbnail_url": stats.thumbnail_url,
-                        "published_at": stats.published_at.isoformat() if stats.published_at else None,
-                        "view_count": stats.view_count,
-                        "like_count": stats.like_count,
-                        "comment_count": stats.comment_count
-                    }, 7200)  # 2 hours = 7200 seconds
-                except Exception as e:
-                    logger.warning("Failed to cache video stats", extra={
+                    published_at = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
+                except ValueError as e:
+                    logger.warning("Failed to parse published date", extra={
                         "video_id": video_id,
+                        "published_at": snippet["publishedAt"],
                         "error": str(e)
                     })
-                
-                return stats
+            
+            stats = YouTubeVideoStats(
+                video_id=video_id,
+                title=snippet.get("title"),
+                description=snippet.get("description"),
+                thumbnail_url=snippet.get("thumbnails", {}).get("medium", {}).get("url"),
+                published_at=published_at,
+                view_count=int(statistics.get("viewCount", 0)),
+                like_count=int(statistics.get("likeCount", 0)),
+                comment_count=int(statistics.get("commentCount", 0))
+            )
+            success = True
+        
+            logger.info("Successfully fetched video stats", extra={
+                "video_id": video_id,
+                "title": stats.title,
+                "view_count": stats.view_count,
+                "like_count": stats.like_count
+            })
+            
+            _cache_video_stats(stats)
+            
+            return stats
         
     except asyncio.TimeoutError as e:
         logger.error("Timeout for video stats", extra={
@@ -411,32 +473,179 @@ async def fetch_video_stats_async(video_id: str) -> Optional[YouTubeVideoStats]:
     return None
 
 
+def _run_sync(coro):
+    """Run a coroutine from sync code, then flush queued quota records and close the
+    shared HTTP session, both of which are bound to its event loop"""
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await quota_manager.flush()
+            await close_http_session()
+    return asyncio.run(runner())
+
+
 def fetch_video_stats(video_id: str) -> Optional[YouTubeVideoStats]:
-    """Synchronous wrapper for fetch_video_stats_async - runs in Discord bot's event loop"""
+    """Synchronous wrapper for fetch_video_stats_async - for Celery tasks (no running event loop).
+    
+    Discord command handlers must await fetch_video_stats_async instead; calling this from a
+    running loop falls back to the blocking requests-based fetch.
+    """
     try:
-        # For Discord bots, we need to schedule the coroutine in the current event loop
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            # Create a task and run it
-            task = loop.create_task(fetch_video_stats_async(video_id))
-            # This won't work in running loop, so we need a different approach
-            # Fall back to sync version for now
-            return _fetch_video_stats_sync(video_id)
-        else:
-            return loop.run_until_complete(fetch_video_stats_async(video_id))
+        asyncio.get_running_loop()
     except RuntimeError:
-        # No event loop, use sync version
-        return _fetch_video_stats_sync(video_id)
+        # No running event loop, safe to drive the async version to completion
+        try:
+            return _run_sync(fetch_video_stats_async(video_id))
+        except Exception as e:
+            logger.error("Error in fetch_video_stats wrapper", extra={
+                "video_id": video_id,
+                "error": str(e)
+            })
+            return _fetch_video_stats_sync(video_id)
+    
+    logger.warning("fetch_video_stats called from a running event loop, use fetch_video_stats_async", extra={
+        "video_id": video_id
+    })
+    return _fetch_video_stats_sync(video_id)
+
+
+# videos.list accepts up to 50 comma-separated IDs for a single quota unit
+VIDEO_STATS_BATCH_SIZE = 50
+
+
+def _parse_video_stats_item(item: dict) -> YouTubeVideoStats:
+    """Build YouTubeVideoStats from a videos.list response item"""
+    video_id = item.get("id", "")
+    snippet = item.get("snippet", {})
+    statistics = item.get("statistics", {})
+    
+    # Parse published date
+    published_at = None
+    if snippet.get("publishedAt"):
+        try:
+            published_at = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
+        except ValueError as e:
+            logger.warning("Failed to parse published date", extra={
+                "video_id": video_id,
+                "published_at": snippet["publishedAt"],
+                "error": str(e)
+            })
+    
+    return YouTubeVideoStats(
+        video_id=video_id,
+        title=snippet.get("title"),
+        description=snippet.get("description"),
+        thumbnail_url=snippet.get("thumbnails", {}).get("medium", {}).get("url"),
+        published_at=published_at,
+        view_count=int(statistics.get("viewCount", 0)),
+        like_count=int(statistics.get("likeCount", 0)),
+        comment_count=int(statistics.get("commentCount", 0))
+    )
+
+
+async def _fetch_video_stats_chunk_async(video_ids: List[str]) -> List[YouTubeVideoStats]:
+    """Fetch statistics for up to 50 videos with a single videos.list request"""
+    if not await quota_manager.wait_if_needed(QuotaType.VIDEO_STATS):
+        logger.error("YouTube API quota exceeded for batched video stats", extra={"video_count": len(video_ids)})
+        return []
+    
+    params = {
+        "id": ",".join(video_ids),
+        "part": "snippet,statistics",
+        "key": get_settings().youtube_api_key,
+    }
+    
+    try:
+        session = get_http_session()
+        async with session.get("https://www.googleapis.com/youtube/v3/videos", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            if resp.status != 200:
+                logger.error("YouTube API batched video stats request failed", extra={
+                    "video_count": len(video_ids),
+                    "status_code": resp.status
+                })
+                await quota_manager.record_request(QuotaType.VIDEO_STATS, success=False)
+                return []
+            
+            data = await resp.json()
+            await quota_manager.record_request(QuotaType.VIDEO_STATS, success=True)
+            return [_parse_video_stats_item(item) for item in data.get("items", [])]
+    
+    except asyncio.TimeoutError as e:
+        logger.error("Timeout for batched video stats", extra={
+            "video_count": len(video_ids),
+            "error": str(e)
+        })
     except Exception as e:
-        logger.error("Error in fetch_video_stats wrapper", extra={
-            "video_id": video_id,
+        logger.error("Unexpected error fetching batched video stats", extra={
+            "video_count": len(video_ids),
             "error": str(e)
         })
-        return _fetch_video_stats_sync(video_id)
+    
+    await quota_manager.record_request(QuotaType.VIDEO_STATS, success=False)
+    return []
+
+
+async def fetch_video_stats_batch_async(video_ids: List[str], concurrency: int = 10) -> dict[str, YouTubeVideoStats]:
+    """Fetch statistics for many videos in 50-ID videos.list batches, keyed by video ID"""
+    settings = get_settings()
+    if not video_ids or not settings.youtube_api_key:
+        logger.warning("Missing video IDs or YouTube API key for batched fetch", extra={
+            "video_count": len(video_ids),
+            "has_api_key": bool(settings.youtube_api_key)
+        })
+        return {}
+    
+    # Preserve order while dropping duplicates
+    unique_ids = list(dict.fromkeys(video_ids))
+    
+    # Serve what we can from the per-video cache in one MGET, only request the rest
+    stats_map = {}
+    missing_ids = []
+    cached_entries = cache_mget_typed([f"youtube:video:{video_id}" for video_id in unique_ids], VideoStatsDTO)
+    for video_id, cached in zip(unique_ids, cached_entries):
+        stats = _video_stats_from_cache(video_id, cached)
+        if stats:
+            stats_map[video_id] = stats
+        else:
+            missing_ids.append(video_id)
+    
+    chunks = [missing_ids[i:i + VIDEO_STATS_BATCH_SIZE] for i in range(0, len(missing_ids), VIDEO_STATS_BATCH_SIZE)]
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch_chunk(chunk: List[str]) -> List[YouTubeVideoStats]:
+        async with semaphore:
+            return await _fetch_video_stats_chunk_async(chunk)
+    
+    results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunks))
+    cached_count = len(stats_map)
+    cache_items = {}
+    for chunk_stats in results:
+        for stats in chunk_stats:
+            stats_map[stats.video_id] = stats
+            cache_items[f"youtube:video:{stats.video_id}"] = (_video_stats_cache_entry(stats), VIDEO_STATS_CACHE_TTL)
+    # Write all fetched stats back in one pipelined round-trip
+    cache_mset_json(cache_items)
+    
+    logger.info("Fetched batched video stats", extra={
+        "requested": len(unique_ids),
+        "cached": cached_count,
+        "fetched": len(stats_map) - cached_count,
+        "api_requests": len(chunks)
+    })
+    return stats_map
+
+
+def fetch_video_stats_batch(video_ids: List[str], concurrency: int = 10) -> dict[str, YouTubeVideoStats]:
+    """Synchronous wrapper for fetch_video_stats_batch_async - for Celery tasks (no running event loop)"""
+    if not video_ids:
+        return {}
+    return _run_sync(fetch_video_stats_batch_async(video_ids, concurrency))
 
 
 def _fetch_video_stats_sync(video_id: str) -> Optional[YouTubeVideoStats]:
     """Synchronous version with basic quota awareness"""
+    settings = get_settings()
     if not video_id or not settings.youtube_api_key:
         logger.warning("Missing video ID or YouTube API key", extra={
             "video_id": video_id,
@@ -444,26 +653,10 @@ def _fetch_video_stats_sync(video_id: str) -> Optional[YouTubeVideoStats]:
         })
         return None
     
-    cache_key = f"youtube:video:{video_id}"
-    
     # Check cache first
-    cached = cache_get_json(cache_key)
-    if cached:
-        try:
-            # Handle datetime conversion from cache
-            if cached.get("published_at"):
-                cached["published_at"] = datetime.fromisoformat(cached["published_at"])
-            stats = YouTubeVideoStats(**cached)
-            logger.info("Retrieved video stats from cache", extra={
-                "video_id": video_id,
-                "view_count": stats.view_count
-            })
-            return stats
-        except Exception as e:
-            logger.warning("Failed to parse cached video stats", extra={
-                "video_id": video_id,
-                "error": str(e)
-            })
+    stats = _get_cached_video_stats(video_id)
+    if stats:
+        return stats
     
     # Add basic delay for rate limiting (sync version)
     import time
@@ -526,23 +719,7 @@ def _fetch_video_stats_sync(video_id: str) -> Optional[YouTubeVideoStats]:
             "like_count": stats.like_count
         })
         
-        # Cache for 2 hours
-        try:
-            cache_set_json(cache_key, {
-                "video_id": stats.video_id,
-                "title": stats.title,
-                "description": stats.description,
-                "thumbnail_url": stats.thumbnail_url,
-                "published_at": stats.published_at.isoformat() if stats.published_at else None,
-                "view_count": stats.view_count,
-                "like_count": stats.like_count,
-                "comment_count": stats.comment_count
-            }, 7200)
-        except Exception as e:
-            logger.warning("Failed to cache video stats (sync)", extra={
-                "video_id": video_id,
-                "error": str(e)
-            })
+        _cache_video_stats(stats)
         
         return stats
         
@@ -562,6 +739,7 @@ def _fetch_video_stats_sync(video_id: str) -> Optional[YouTubeVideoStats]:
 
 def get_video_channel_id(video_id: str) -> Optional[str]:
     """Get the channel ID for a specific video"""
+    settings = get_settings()
     if not video_id or not settings.youtube_api_key:
         logger.warning("Missing video ID or YouTube API key for channel lookup", extra={
             "video_id": video_id,
@@ -569,6 +747,11 @@ def get_video_channel_id(video_id: str) -> Optional[str]:
         })
         return None
     
+    cache_key = f"youtube:video_channel:{video_id}"
+    channel_id = _get_cached_channel_id(cache_key)
+    if channel_id:
+        return channel_id
+    
     logger.info("Fetching channel ID for video", extra={"video_id": video_id})
     
     params = {
@@ -601,6 +784,7 @@ def get_video_channel_id(video_id: str) -> Optional[str]:
                 "video_id": video_id,
                 "channel_id": channel_id
             })
+            cache_set_json(cache_key, {"channel_id": channel_id}, CHANNEL_LOOKUP_CACHE_TTL)
             return channel_id
         else:
             logger.warning("No channel ID found in video snippet", extra={"video_id": video_id})
@@ -622,6 +806,7 @@ def get_video_channel_id(video_id: str) -> Optional[str]:
 
 def fetch_channel_info_fresh(channel_id: str) -> Optional[YouTubeChannelInfo]:
     """Fetch fresh channel information from YouTube API (bypasses cache)"""
+    settings = get_settings()
     if not channel_id or not settings.youtube_api_key:
         logger.warning("Missing channel ID or YouTube API key for fresh fetch", extra={
             "channel_id": channel_id,
@@ -687,8 +872,53 @@ def fetch_channel_info_fresh(channel_id: str) -> Optional[YouTubeChannelInfo]:
         return None
 
 
+# Channel info changes rarely; unknown channels are remembered for a shorter time
+CHANNEL_INFO_CACHE_TTL = 86400
+CHANNEL_INFO_NEGATIVE_CACHE_TTL = 3600
+
+
+def _get_cached_channel_info(channel_id: str) -> tuple[bool, Optional[YouTubeChannelInfo]]:
+    """Return (hit, info) for a cached channel; a hit with info None means the channel is known not to exist"""
+    cached = cache_get_json(f"youtube:channel:{channel_id}")
+    if not cached:
+        logger.info("Channel info cache miss", extra={"channel_id": channel_id})
+        return False, None
+    if cached.get("missing"):
+        logger.info("Channel info cache hit (not found)", extra={"channel_id": channel_id})
+        return True, None
+    try:
+        info = YouTubeChannelInfo(**cached)
+    except TypeError as e:
+        logger.warning("Failed to parse cached channel info", extra={
+            "channel_id": channel_id,
+            "error": str(e)
+        })
+        return False, None
+    logger.info("Retrieved channel info from cache", extra={
+        "channel_id": channel_id,
+        "channel_name": info.channel_name
+    })
+    return True, info
+
+
+def _cache_channel_info(channel_id: str, info: Optional[YouTubeChannelInfo]) -> None:
+    """Cache channel info, or a not-found marker when info is None"""
+    if info is None:
+        cache_set_json(f"youtube:channel:{channel_id}", {"missing": True}, CHANNEL_INFO_NEGATIVE_CACHE_TTL)
+        return
+    cache_set_json(f"youtube:channel:{channel_id}", {
+        "channel_id": info.channel_id,
+        "channel_name": info.channel_name,
+        "description": info.description,
+        "subscriber_count": info.subscriber_count,
+        "video_count": info.video_count,
+        "view_count": info.view_count
+    }, CHANNEL_INFO_CACHE_TTL)
+
+
 def fetch_channel_info(channel_id: str) -> Optional[YouTubeChannelInfo]:
     """Fetch channel information from YouTube API with caching"""
+    settings = get_settings()
     if not channel_id or not settings.youtube_api_key:
         logger.warning("Missing channel ID or YouTube API key", extra={
             "channel_id": channel_id,
@@ -696,16 +926,9 @@ def fetch_channel_info(channel_id: str) -> Optional[YouTubeChannelInfo]:
         })
         return None
     
-    cache_key = f"youtube:channel:{channel_id}"
-    
     # Check cache first
-    cached = cache_get_json(cache_key)
-    if cached:
-        info = YouTubeChannelInfo(**cached)
-        logger.info("Retrieved channel info from cache", extra={
-            "channel_id": channel_id,
-            "channel_name": info.channel_name
-        })
+    hit, info = _get_cached_channel_info(channel_id)
+    if hit:
         return info
     
     # Add basic delay for rate limiting
@@ -733,6 +956,7 @@ def fetch_channel_info(channel_id: str) -> Optional[YouTubeChannelInfo]:
         items = data.get("items", [])
         if not items:
             logger.warning("Channel not found in YouTube API response", extra={"channel_id": channel_id})
+            _cache_channel_info(channel_id, None)
             return None
         
         item = items[0]
@@ -754,16 +978,8 @@ def fetch_channel_info(channel_id: str) -> Optional[YouTubeChannelInfo]:
             "subscriber_count": info.subscriber_count
         })
         
-        # Cache for 4 hours (extended from 10 minutes to reduce API calls)
         try:
-            cache_set_json(cache_key, {
-                "channel_id": info.channel_id,
-                "channel_name": info.channel_name,
-                "description": info.description,
-                "subscriber_count": info.subscriber_count,
-                "video_count": info.video_count,
-                "view_count": info.view_count
-            }, 14400)  # 4 hours = 14400 seconds
+            _cache_channel_info(channel_id, info)
         except Exception as e:
             logger.warning("Failed to cache channel info", extra={
                 "channel_id": channel_id,
@@ -786,8 +1002,42 @@ def fetch_channel_info(channel_id: str) -> Optional[YouTubeChannelInfo]:
         return None
 
 
+def _parse_channel_video_items(items: List[dict]) -> List[YouTubeVideo]:
+    """Build YouTubeVideo objects from search.list response items"""
+    videos = []
+    for item in items:
+        snippet = item.get("snippet", {})
+        video_id = item.get("id", {}).get("videoId", "")
+        
+        if not video_id:
+            continue
+        
+        # Parse published date
+        published_at = None
+        if snippet.get("publishedAt"):
+            try:
+                published_at = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
+            except ValueError as e:
+                logger.warning("Failed to parse video published date", extra={
+                    "video_id": video_id,
+                    "published_at": snippet["publishedAt"],
+                    "error": str(e)
+                })
+        
+        videos.append(YouTubeVideo(
+            video_id=video_id,
+            title=snippet.get("title", ""),
+            description=snippet.get("description"),
+            thumbnail_url=snippet.get("thumbnails", {}).get("medium", {}).get("url"),
+            published_at=published_at,
+            view_count=0  # Will be fetched separately if needed
+        ))
+    return videos
+
+
 def fetch_channel_videos(channel_id: str, max_results: int = 50) -> List[YouTubeVideo]:
     """Fetch recent videos from a channel"""
+    settings = get_settings()
     if not channel_id or not settings.youtube_api_key:
         logger.warning("Missing channel ID or YouTube API key for video fetch", extra={
             "channel_id": channel_id,
@@ -823,37 +1073,7 @@ def fetch_channel_videos(channel_id: str, max_results: int = 50) -> List[YouTube
             return []
         
         data = resp.json()
-        items = data.get("items", [])
-        
-        videos = []
-        for item in items:
-            snippet = item.get("snippet", {})
-            video_id = item.get("id", {}).get("videoId", "")
-            
-            if not video_id:
-                continue
-            
-            # Parse published date
-            published_at = None
-            if snippet.get("publishedAt"):
-                try:
-                    published_at = datetime.fromisoformat(snippet["publishedAt"].replace("Z", "+00:00"))
-                except ValueError as e:
-                    logger.warning("Failed to parse video published date", extra={
-                        "video_id": video_id,
-                        "published_at": snippet["publishedAt"],
-                        "error": str(e)
-                    })
-            
-            video = YouTubeVideo(
-                video_id=video_id,
-                title=snippet.get("title", ""),
-                description=snippet.get("description"),
-                thumbnail_url=snippet.get("thumbnails", {}).get("medium", {}).get("url"),
-                published_at=published_at,
-                view_count=0  # Will be fetched separately if needed
-            )
-            videos.append(video)
+        videos = _parse_channel_video_items(data.get("items", []))
         
         logger.info("Successfully fetched channel videos", extra={
             "channel_id": channel_id,
@@ -876,6 +1096,112 @@ def fetch_channel_videos(channel_id: str, max_results: int = 50) -> List[YouTube
         return []
 
 
+async def fetch_channel_videos_async(channel_id: str, max_results: int = 50) -> List[YouTubeVideo]:
+    """Fetch recent videos from a channel asynchronously"""
+    settings = get_settings()
+    if not channel_id or not settings.youtube_api_key:
+        logger.warning("Missing channel ID or YouTube API key for async video fetch", extra={
+            "channel_id": channel_id,
+            "has_api_key": bool(settings.youtube_api_key)
+        })
+        return []
+    
+    # Check quota and wait if needed
+    if not await quota_manager.wait_if_needed(QuotaType.CHANNEL_VIDEOS):
+        logger.error("YouTube API quota exceeded for channel videos", extra={"channel_id": channel_id})
+        return []
+    
+    logger.info("Fetching channel videos asynchronously", extra={
+        "channel_id": channel_id,
+        "max_results": max_results
+    })
+    
+    params = {
+        "channelId": channel_id,
+        "part": "snippet",
+        "order": "date",
+        "maxResults": max_results,
+        "type": "video",
+        "key": settings.youtube_api_key,
+    }
+    
+    try:
+        session = get_http_session()
+        async with session.get("https://www.googleapis.com/youtube/v3/search", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            if resp.status != 200:
+                logger.error("YouTube API request failed for async channel videos", extra={
+                    "channel_id": channel_id,
+                    "status_code": resp.status
+                })
+                await quota_manager.record_request(QuotaType.CHANNEL_VIDEOS, success=False)
+                return []
+            
+            data = await resp.json()
+        
+        await quota_manager.record_request(QuotaType.CHANNEL_VIDEOS, success=True)
+        videos = _parse_channel_video_items(data.get("items", []))
+        
+        logger.info("Successfully fetched channel videos asynchronously", extra={
+            "channel_id": channel_id,
+            "video_count": len(videos)
+        })
+        return videos
+    
+    except asyncio.TimeoutError as e:
+        logger.error("Timeout for async channel videos", extra={
+            "channel_id": channel_id,
+            "error": str(e)
+        })
+    except Exception as e:
+        logger.error("Unexpected error fetching channel videos asynchronously", extra={
+            "channel_id": channel_id,
+            "error": str(e)
+        })
+    
+    await quota_manager.record_request(QuotaType.CHANNEL_VIDEOS, success=False)
+    return []
+
+
+async def fetch_channel_videos_with_stats_async(
+    channel_ids: List[str], max_results: int = 50, concurrency: int = 5
+) -> dict[str, tuple[List[YouTubeVideo], dict[str, YouTubeVideoStats]]]:
+    """Fetch recent videos and their stats for many channels concurrently, keyed by channel ID.
+    
+    Channels whose fetch raised are left out of the result.
+    """
+    unique_ids = list(dict.fromkeys(channel_ids))
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch_channel(channel_id: str) -> tuple[List[YouTubeVideo], dict[str, YouTubeVideoStats]]:
+        async with semaphore:
+            videos = await fetch_channel_videos_async(channel_id, max_results)
+            if not videos:
+                return videos, {}
+            return videos, await fetch_video_stats_batch_async([v.video_id for v in videos])
+    
+    results = await asyncio.gather(*(fetch_channel(channel_id) for channel_id in unique_ids), return_exceptions=True)
+    
+    channel_results = {}
+    for channel_id, result in zip(unique_ids, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to fetch channel videos with stats", extra={
+                "channel_id": channel_id,
+                "error": str(result)
+            })
+            continue
+        channel_results[channel_id] = result
+    return channel_results
+
+
+def fetch_channel_videos_with_stats(
+    channel_ids: List[str], max_results: int = 50, concurrency: int = 5
+) -> dict[str, tuple[List[YouTubeVideo], dict[str, YouTubeVideoStats]]]:
+    """Synchronous wrapper for fetch_channel_videos_with_stats_async - for Celery tasks (no running event loop)"""
+    if not channel_ids:
+        return {}
+    return _run_sync(fetch_channel_videos_with_stats_async(channel_ids, max_results, concurrency))
+
+
 def check_verification(channel_id: str, verification_code: str) -> bool:
     """Check if verification code exists in channel description with cache bypass"""
     if not channel_id or not verification_code:
@@ -1013,6 +1339,7 @@ def is_channel_url(url: str) -> bool:
 
 async def fetch_channel_info_async(channel_id: str) -> Optional[YouTubeChannelInfo]:
     """Fetch channel information from YouTube API asynchronously"""
+    settings = get_settings()
     if not channel_id or not settings.youtube_api_key:
         logger.warning("Missing channel ID or YouTube API key for async fetch", extra={
             "channel_id": channel_id,
@@ -1020,6 +1347,15 @@ async def fetch_channel_info_async(channel_id: str) -> Optional[YouTubeChannelIn
         })
         return None
     
+    # Served from cache without touching the API quota
+    hit, info = _get_cached_channel_info(channel_id)
+    if hit:
+        return info
+    
+    if not await quota_manager.wait_if_needed(QuotaType.CHANNEL_INFO):
+        logger.warning("Quota exhausted, skipping async channel fetch", extra={"channel_id": channel_id})
+        return None
+    
     logger.info("Fetching channel info asynchronously from YouTube API", extra={"channel_id": channel_id})
     
     params = {
@@ -1029,41 +1365,45 @@ async def fetch_channel_info_async(channel_id: str) -> Optional[YouTubeChannelIn
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://www.googleapis.com/youtube/v3/channels", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                if resp.status != 200:
-                    logger.error("YouTube API request failed for async channel fetch", extra={
-                        "channel_id": channel_id,
-                        "status_code": resp.status
-                    })
-                    return None
-                
-                data = await resp.json()
-                items = data.get("items", [])
-                if not items:
-                    logger.warning("Channel not found in YouTube API response (async fetch)", extra={"channel_id": channel_id})
-                    return None
-                
-                item = items[0]
-                snippet = item.get("snippet", {})
-                statistics = item.get("statistics", {})
-                
-                info = YouTubeChannelInfo(
-                    channel_id=channel_id,
-                    channel_name=snippet.get("title", ""),
-                    description=snippet.get("description"),
-                    subscriber_count=int(statistics.get("subscriberCount", 0)) if statistics.get("subscriberCount") else None,
-                    video_count=int(statistics.get("videoCount", 0)) if statistics.get("videoCount") else None,
-                    view_count=int(statistics.get("viewCount", 0)) if statistics.get("viewCount") else None
-                )
-                
-                logger.info("Successfully fetched channel info asynchronously", extra={
+        session = get_http_session()
+        async with session.get("https://www.googleapis.com/youtube/v3/channels", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            if resp.status != 200:
+                logger.error("YouTube API request failed for async channel fetch", extra={
                     "channel_id": channel_id,
-                    "channel_name": info.channel_name,
-                    "description_length": len(info.description) if info.description else 0
+                    "status_code": resp.status
                 })
-                
-                return info
+                await quota_manager.record_request(QuotaType.CHANNEL_INFO, success=False)
+                return None
+            
+            data = await resp.json()
+            await quota_manager.record_request(QuotaType.CHANNEL_INFO, success=True)
+            items = data.get("items", [])
+            if not items:
+                logger.warning("Channel not found in YouTube API response (async fetch)", extra={"channel_id": channel_id})
+                _cache_channel_info(channel_id, None)
+                return None
+            
+            item = items[0]
+            snippet = item.get("snippet", {})
+            statistics = item.get("statistics", {})
+            
+            info = YouTubeChannelInfo(
+                channel_id=channel_id,
+                channel_name=snippet.get("title", ""),
+                description=snippet.get("description"),
+                subscriber_count=int(statistics.get("subscriberCount", 0)) if statistics.get("subscriberCount") else None,
+                video_count=int(statistics.get("videoCount", 0)) if statistics.get("videoCount") else None,
+                view_count=int(statistics.get("viewCount", 0)) if statistics.get("viewCount") else None
+            )
+            
+            logger.info("Successfully fetched channel info asynchronously", extra={
+                "channel_id": channel_id,
+                "channel_name": info.channel_name,
+                "description_length": len(info.description) if info.description else 0
+            })
+            
+            _cache_channel_info(channel_id, info)
+            return info
                 
     except asyncio.TimeoutError as e:
         logger.error("Timeout for async channel info fetch", extra={
@@ -1080,7 +1420,42 @@ async def fetch_channel_info_async(channel_id: str) -> Optional[YouTubeChannelIn
 
 
 async def get_channel_id_from_username_async(username: str) -> Optional[str]:
+    """Convert YouTube username/handle to channel ID asynchronously, caching resolved IDs"""
+    if not username:
+        return None
+    
+    normalized = _normalize_username(username)
+    cache_key = f"youtube:username:{normalized}"
+    channel_id = _get_cached_channel_id(cache_key)
+    if channel_id:
+        return channel_id
+    
+    lock = _username_lookup_locks.setdefault(normalized, asyncio.Lock())
+    _username_lookup_users[normalized] = _username_lookup_users.get(normalized, 0) + 1
+    try:
+        async with lock:
+            # Another command may have resolved this handle while we waited
+            channel_id = _get_cached_channel_id(cache_key)
+            if channel_id:
+                return channel_id
+            
+            channel_id = await _lookup_channel_id_from_username_async(username)
+            if channel_id:
+                cache_set_json(cache_key, {"channel_id": channel_id}, CHANNEL_LOOKUP_CACHE_TTL)
+            return channel_id
+    finally:
+        # Drop the lock only when no other caller still holds or waits on it
+        remaining = _username_lookup_users[normalized] - 1
+        if remaining:
+            _username_lookup_users[normalized] = remaining
+        else:
+            del _username_lookup_users[normalized]
+            _username_lookup_locks.pop(normalized, None)
+
+
+async def _lookup_channel_id_from_username_async(username: str) -> Optional[str]:
     """Convert YouTube username/handle to channel ID using API asynchronously"""
+    settings = get_settings()
     if not username or not settings.youtube_api_key:
         logger.warning("Missing username or YouTube API key for async channel ID lookup", extra={
             "username": username,
@@ -1088,15 +1463,7 @@ async def get_channel_id_from_username_async(username: str) -> Optional[str]:
         })
         return None
     
-    # Clean the username
-    username = username.strip()
-    
-    # Remove @ symbol if present
-    if username.startswith('@'):
-        username = username[1:]
-    
-    # Remove any trailing slashes or parameters
-    username = username.split('/')[0].split('?')[0].split('&')[0]
+    username = _normalize_username(username)
     
     logger.info("Looking up channel ID asynchronously for username", extra={"username": username})
     
@@ -1110,18 +1477,18 @@ async def get_channel_id_from_username_async(username: str) -> Optional[str]:
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://www.googleapis.com/youtube/v3/search", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    items = data.get("items", [])
-                    if items:
-                        channel_id = items[0].get("id", {}).get("channelId")
-                        logger.info("Found channel ID via async search", extra={
-                            "username": username,
-                            "channel_id": channel_id
-                        })
-                        return channel_id
+        session = get_http_session()
+        async with session.get("https://www.googleapis.com/youtube/v3/search", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            if resp.status == 200:
+                data = await resp.json()
+                items = data.get("items", [])
+                if items:
+                    channel_id = items[0].get("id", {}).get("channelId")
+                    logger.info("Found channel ID via async search", extra={
+                        "username": username,
+                        "channel_id": channel_id
+                    })
+                    return channel_id
     except asyncio.TimeoutError as e:
         logger.error("Timeout for async channel search", extra={
             "username": username,
@@ -1144,18 +1511,18 @@ async def get_channel_id_from_username_async(username: str) -> Optional[str]:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get("https://www.googleapis.com/youtube/v3/search", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        items = data.get("items", [])
-                        if items:
-                            channel_id = items[0].get("id", {}).get("channelId")
-                            logger.info("Found channel ID via async search (no @)", extra={
-                                "username": username,
-                                "channel_id": channel_id
-                            })
-                            return channel_id
+            session = get_http_session()
+            async with session.get("https://www.googleapis.com/youtube/v3/search", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    items = data.get("items", [])
+                    if items:
+                        channel_id = items[0].get("id", {}).get("channelId")
+                        logger.info("Found channel ID via async search (no @)", extra={
+                            "username": username,
+                            "channel_id": channel_id
+                        })
+                        return channel_id
         except asyncio.TimeoutError as e:
             logger.error("Timeout for async channel search (no @)", extra={
                 "username": username,
@@ -1175,18 +1542,18 @@ async def get_channel_id_from_username_async(username: str) -> Optional[str]:
     }
     
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://www.googleapis.com/youtube/v3/channels", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    items = data.get("items", [])
-                    if items:
-                        channel_id = items[0].get("id")
-                        logger.info("Found channel ID via async legacy lookup", extra={
-                            "username": username,
-                            "channel_id": channel_id
-                        })
-                        return channel_id
+        session = get_http_session()
+        async with session.get("https://www.googleapis.com/youtube/v3/channels", params=params, timeout=aiohttp.ClientTimeout(total=15)) as resp:
+            if resp.status == 200:
+                data = await resp.json()
+                items = data.get("items", [])
+                if items:
+                    channel_id = items[0].get("id")
+                    logger.info("Found channel ID via async legacy lookup", extra={
+                        "username": username,
+                        "channel_id": channel_id
+                    })
+                    return channel_id
     except asyncio.TimeoutError as e:
         logger.error("Timeout for async legacy channel lookup", extra={
             "username": username,
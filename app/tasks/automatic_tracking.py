@@ -3,13 +3,15 @@ from __future__ import annotations
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional
 import asyncio
+import calendar
 
-from sqlalchemy import select, and_, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, and_, or_, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import raiseload, selectinload
 
-from app.infrastructure.db import session_scope
+from app.infrastructure.db import bulk_upsert_monthly_views, ensure_monthly_views_partition, next_month, session_scope
 from app.models import User, Channel, Video, MonthlyView
-from app.services.youtube import fetch_video_stats, fetch_channel_videos
+from app.services.youtube import fetch_video_stats_batch, fetch_channel_videos_with_stats
 from app.tasks.celery_app import celery_app
 from app.utils.logger import bot_logger
 
@@ -18,9 +20,14 @@ from app.utils.logger import bot_logger
 def sync_new_videos_from_channels():
     """Automatically sync new videos from all verified channels"""
     with session_scope() as session:
-        # Get all verified channels
+        # Get all verified channels along with their videos (one extra IN query, only the columns used below)
         channels = session.execute(
-            select(Channel).where(
+            select(Channel)
+            .options(
+                selectinload(Channel.videos).load_only(Video.id, Video.user_id, Video.video_id, Video.last_view_count, Video.last_updated_at).raiseload("*"),
+                raiseload("*")
+            )
+            .where(
                 and_(
                     Channel.is_verified == True,
                     Channel.is_active == True
@@ -32,89 +39,82 @@ def sync_new_videos_from_channels():
         total_updated_videos = 0
         errors = 0
         
+        # Fetch current stats for every tracked video across all channels in batched API requests
+        stats_map = fetch_video_stats_batch([video.video_id for channel in channels for video in channel.videos])
+        
+        # Fetch recent videos and their stats for all channels concurrently; DB writes stay serial below
+        channel_results = fetch_channel_videos_with_stats([c.channel_id for c in channels], max_results=50)
+        
+        now = datetime.now(timezone.utc)
+        video_updates = []
+        monthly_rows = []
+        
         for channel in channels:
             try:
-                # Fetch recent videos from channel
-                channel_videos = fetch_channel_videos(channel.channel_id, max_results=50)
+                # Recent videos and their stats were fetched concurrently above
+                fetched = channel_results.get(channel.channel_id)
+                if fetched is None:
+                    raise RuntimeError("failed to fetch channel videos")
+                channel_videos, channel_stats = fetched
                 if not channel_videos:
                     continue
                 
-                # Get existing videos for this channel
-                existing_videos = session.execute(
-                    select(Video).where(Video.channel_id == channel.id)
-                ).scalars().all()
+                # Existing videos for this channel were eager-loaded above
+                existing_videos = list(channel.videos)
                 existing_video_ids = {v.video_id for v in existing_videos}
                 
                 # Find new videos
-                new_videos = [v for v in channel_videos if v.video_id not in existing_video_ids]
+                new_video_rows = [
+                    {
+                        "user_id": channel.user_id,
+                        "channel_id": channel.id,
+                        "video_id": video_data.video_id,
+                        "url": f"https://www.youtube.com/watch?v={video_data.video_id}",
+                        "title": stats.title,
+                        "description": stats.description,
+                        "thumbnail_url": stats.thumbnail_url,
+                        "published_at": stats.published_at,
+                        "last_view_count": stats.view_count,
+                    }
+                    for video_data in channel_videos
+                    if video_data.video_id not in existing_video_ids
+                    and (stats := channel_stats.get(video_data.video_id))
+                ]
                 
-                # Add new videos
-                for video_data in new_videos:
-                    try:
-                        video = Video(
-                            user_id=channel.user_id,
-                            channel_id=channel.id,
-                            video_id=video_data.video_id,
-                            url=f"https://www.youtube.com/watch?v={video_data.video_id}",
-                            title=video_data.title,
-                            description=video_data.description,
-                            thumbnail_url=video_data.thumbnail_url,
-                            published_at=video_data.published_at,
-                            last_view_count=video_data.view_count,
-                            last_updated_at=datetime.now(timezone.utc),
-                            created_at=datetime.now(timezone.utc)
-                        )
-                        session.add(video)
-                        total_new_videos += 1
-                        
-                        bot_logger.info(f"Added new video {video_data.video_id} from channel {channel.channel_name}")
-                        
-                    except Exception as e:
-                        errors += 1
-                        bot_logger.error(f"Error adding video {video_data.video_id}: {e}")
-                        continue
+                # Add new videos in one statement; rows that already exist are skipped by the unique constraints
+                if new_video_rows:
+                    inserted_ids = session.execute(
+                        pg_insert(Video)
+                        .values(new_video_rows)
+                        .on_conflict_do_nothing()
+                        .returning(Video.id)
+                    ).scalars().all()
+                    total_new_videos += len(inserted_ids)
+                    
+                    if inserted_ids:
+                        bot_logger.info(f"Added {len(inserted_ids)} new videos from channel {channel.channel_name}")
                 
                 # Update existing videos with current stats
                 for video in existing_videos:
                     try:
-                        stats = fetch_video_stats(video.video_id)
+                        stats = stats_map.get(video.video_id)
                         if stats:
                             # Calculate view change
                             view_change = stats.view_count - video.last_view_count
                             
                             # Update video record
-                            video.last_view_count = stats.view_count
-                            video.last_updated_at = datetime.now(timezone.utc)
-                            
-                            # Update or create monthly view record
-                            now = datetime.now(timezone.utc)
-                            monthly_view = session.execute(
-                                select(MonthlyView).where(
-                                    and_(
-                                        MonthlyView.video_id == video.id,
-                                        MonthlyView.year == now.year,
-                                        MonthlyView.month == now.month
-                                    )
-                                )
-                            ).scalar_one_or_none()
+                            video_updates.append({"id": video.id, "last_view_count": stats.view_count, "last_updated_at": now})
                             
-                            if monthly_view:
-                                # Add only incremental view change to monthly total
-                                if view_change > 0:
-                                    monthly_view.views += view_change
-                                monthly_view.updated_at = now
-                            else:
-                                # Create new monthly view record starting from current baseline
-                                monthly_view = MonthlyView(
-                                    user_id=video.user_id,
-                                    video_id=video.id,
-                                    year=now.year,
-                                    month=now.month,
-                                    views=0,  # Start at 0 - only track incremental views
-                                    views_change=0,
-                                    updated_at=now
-                                )
-                                session.add(monthly_view)
+                            # New monthly records start at 0 - only track incremental views
+                            monthly_rows.append({
+                                "user_id": video.user_id,
+                                "video_id": video.id,
+                                "year": now.year,
+                                "month": now.month,
+                                "views": 0,
+                                "views_change": view_change,
+                                "updated_at": now,
+                            })
                             
                             total_updated_videos += 1
                             
@@ -124,13 +124,20 @@ def sync_new_videos_from_channels():
                         continue
                 
                 # Update channel last sync time
-                channel.last_sync_at = datetime.now(timezone.utc)
+                channel.last_sync_at = now
                 
             except Exception as e:
                 errors += 1
                 bot_logger.error(f"Error syncing channel {channel.channel_id}: {e}")
                 continue
         
+        # Write all video stat updates in one executemany UPDATE
+        if video_updates:
+            session.execute(update(Video), video_updates)
+        
+        # Update or create all monthly view records in one statement
+        bulk_upsert_monthly_views(session, monthly_rows)
+        
         bot_logger.info(f"Auto sync complete: {total_new_videos} new videos, {total_updated_videos} updated, {errors} errors")
         return {
             "new_videos": total_new_videos,
@@ -145,8 +152,7 @@ def generate_monthly_summary():
     now = datetime.now(timezone.utc)
     
     # Check if it's the last day of the month
-    tomorrow = now + timedelta(days=1)
-    if tomorrow.day != 1:
+    if now.day != calendar.monthrange(now.year, now.month)[1]:
         return {"message": "Not end of month"}
     
     with session_scope() as session:
@@ -155,47 +161,47 @@ def generate_monthly_summary():
             select(User).distinct().join(Video)
         ).scalars().all()
         
+        # Previous month for comparison
+        if now.month == 1:
+            prev_month = 12
+            prev_year = now.year - 1
+        else:
+            prev_month = now.month - 1
+            prev_year = now.year
+        
+        is_current_month = and_(MonthlyView.year == now.year, MonthlyView.month == now.month)
+        is_prev_month = and_(MonthlyView.year == prev_year, MonthlyView.month == prev_month)
+        
+        # Current and previous month totals for every user in one grouped query
+        month_totals = {
+            user_id: (current_views or 0, prev_views or 0)
+            for user_id, current_views, prev_views in session.execute(
+                select(
+                    MonthlyView.user_id,
+                    func.sum(MonthlyView.views).filter(is_current_month),
+                    func.sum(MonthlyView.views).filter(is_prev_month)
+                )
+                .where(or_(is_current_month, is_prev_month))
+                .group_by(MonthlyView.user_id)
+            ).all()
+        }
+        
+        # Video counts for every user in one grouped query
+        video_counts = dict(session.execute(
+            select(Video.user_id, func.count(Video.id)).group_by(Video.user_id)
+        ).all())
+        
         summaries = []
         
         for user in users:
             try:
-                # Get current month's data
-                current_month_views = session.execute(
-                    select(func.sum(MonthlyView.views)).where(
-                        and_(
-                            MonthlyView.user_id == user.id,
-                            MonthlyView.year == now.year,
-                            MonthlyView.month == now.month
-                        )
-                    )
-                ).scalar() or 0
-                
-                # Get previous month's data for comparison
-                if now.month == 1:
-                    prev_month = 12
-                    prev_year = now.year - 1
-                else:
-                    prev_month = now.month - 1
-                    prev_year = now.year
-                
-                prev_month_views = session.execute(
-                    select(func.sum(MonthlyView.views)).where(
-                        and_(
-                            MonthlyView.user_id == user.id,
-                            MonthlyView.year == prev_year,
-                            MonthlyView.month == prev_month
-                        )
-                    )
-                ).scalar() or 0
+                current_month_views, prev_month_views = month_totals.get(user.id, (0, 0))
                 
                 # Calculate growth
                 growth = current_month_views - prev_month_views
                 growth_percent = (growth / prev_month_views * 100) if prev_month_views > 0 else 0
                 
-                # Get video count
-                video_count = session.execute(
-                    select(func.count(Video.id)).where(Video.user_id == user.id)
-                ).scalar() or 0
+                video_count = video_counts.get(user.id, 0)
                 
                 summaries.append({
                     "user_id": user.discord_user_id,
@@ -230,58 +236,40 @@ def cleanup_old_data():
         monthly_cutoff_month = monthly_cutoff_date.month
         
         # Step 1: Clean up videos older than 2 months (reduces API load)
-        old_videos = session.execute(
-            select(Video).where(
+        # Mark them inactive in one UPDATE (stops tracking without losing data)
+        deactivated_ids = session.execute(
+            update(Video)
+            .where(
                 and_(
                     Video.created_at < video_cutoff_date,
                     Video.is_active == True
                 )
             )
+            .values(is_active=False)
+            .returning(Video.id)
+            .execution_options(synchronize_session=False)
         ).scalars().all()
         
-        deactivated_videos = 0
+        deactivated_videos = len(deactivated_ids)
         deleted_monthly_views = 0
         
-        for video in old_videos:
-            # Mark video as inactive (stops tracking without losing data)
-            video.is_active = False
-            deactivated_videos += 1
-            
-            # Clean up monthly views for deactivated videos
-            monthly_views_deleted = session.execute(
-                select(func.count(MonthlyView.id)).where(
-                    MonthlyView.video_id == video.id
-                )
-            ).scalar() or 0
-            
-            if monthly_views_deleted > 0:
-                session.execute(
-                    MonthlyView.__table__.delete().where(
-                        MonthlyView.video_id == video.id
-                    )
+        # Clean up monthly views for deactivated videos
+        if deactivated_ids:
+            deleted_monthly_views += session.execute(
+                MonthlyView.__table__.delete().where(
+                    MonthlyView.video_id.in_(deactivated_ids)
                 )
-                deleted_monthly_views += monthly_views_deleted
+            ).rowcount
         
         # Step 2: Clean up old monthly view records (older than 2 years)
-        old_monthly_views = session.execute(
-            select(func.count(MonthlyView.id)).where(
+        deleted_monthly_views += session.execute(
+            MonthlyView.__table__.delete().where(
                 and_(
                     MonthlyView.year < monthly_cutoff_year,
                     MonthlyView.month < monthly_cutoff_month
                 )
             )
-        ).scalar() or 0
-        
-        if old_monthly_views > 0:
-            session.execute(
-                MonthlyView.__table__.delete().where(
-                    and_(
-                        MonthlyView.year < monthly_cutoff_year,
-                        MonthlyView.month < monthly_cutoff_month
-                    )
-                )
-            )
-            deleted_monthly_views += old_monthly_views
+        ).rowcount
         
         bot_logger.info(f"Cleanup complete: {deactivated_videos} videos deactivated (2+ months old), {deleted_monthly_views} monthly view records deleted")
         
@@ -291,3 +279,16 @@ def cleanup_old_data():
             "video_cutoff_days": 60,
             "monthly_cutoff_days": 730
         }
+
+
+@celery_app.task
+def create_next_monthly_views_partition():
+    """Create next month's monthly_views partition ahead of its first rows"""
+    now = datetime.now(timezone.utc)
+    year, month = next_month(now.year, now.month)
+    with session_scope() as session:
+        created = ensure_monthly_views_partition(session.connection(), year, month)
+    if not created:
+        return {"year": year, "month": month, "skipped": True}
+    bot_logger.info(f"Ensured monthly_views partition for {year}-{month:02d}")
+    return {"year": year, "month": month, "skipped": False}
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from celery import Celery
 
-from app.config import settings
+from app.config import get_settings
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -10,8 +10,8 @@ logger = get_logger(__name__)
 # Initialize Celery app
 celery_app = Celery(
     "databot",
-    broker=settings.redis_url,
-    backend=settings.redis_url,
+    broker=get_settings().redis_url,
+    backend=get_settings().redis_url,
     include=[
         "app.tasks.refresh_stats",
         "app.tasks.monthly_reports",
@@ -51,6 +51,10 @@ celery_app.conf.beat_schedule = {
     "cleanup-old-data-daily": {
         "task": "app.tasks.automatic_tracking.cleanup_old_data",
         "schedule": 24 * 60 * 60,  # Daily (changed from weekly for 2-month video cleanup)
+    },
+    "create-monthly-views-partition-daily": {
+        "task": "app.tasks.automatic_tracking.create_next_monthly_views_partition",
+        "schedule": 24 * 60 * 60,  # Daily; idempotent, keeps next month's partition in place before it starts
     }
 }
 
@@ -59,7 +63,7 @@ celery_app.conf.update(
     task_serializer='json',
     accept_content=['json'],
     result_serializer='json',
-    timezone=settings.default_timezone,
+    timezone=get_settings().default_timezone,
     enable_utc=True,
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
@@ -67,9 +71,9 @@ celery_app.conf.update(
 )
 
 logger.info("Celery app configured", extra={
-    "broker_url": settings.redis_url.split("@")[-1] if "@" in settings.redis_url else "local",
-    "timezone": settings.default_timezone,
-    "environment": settings.environment
+    "broker_url": get_settings().redis_url.split("@")[-1] if "@" in get_settings().redis_url else "local",
+    "timezone": get_settings().default_timezone,
+    "environment": get_settings().environment
 })
 
 
@@ -1,18 +1,25 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from typing import Dict, List, Optional
 import asyncio
+import calendar
+import heapq
 
-from sqlalchemy import select, and_, func
-from sqlalchemy.orm import joinedload
+from sqlalchemy import select, and_, func, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import raiseload, selectinload
 
-from app.infrastructure.db import session_scope
+from app.infrastructure.cache import cache_acquire_lock
+from app.infrastructure.db import bulk_upsert_monthly_views, readonly_scope, session_scope
 from app.models import User, Video, MonthlyView, Channel
-from app.services.youtube import fetch_video_stats, fetch_channel_videos
+from app.services.youtube import fetch_video_stats_batch, fetch_channel_videos_with_stats
 from app.tasks.celery_app import celery_app
 from app.utils.logger import bot_logger
 
+# Per-user sync/refresh tasks dispatched within this window are deduplicated
+USER_TASK_LOCK_TTL = 60
+
 
 @celery_app.task
 def trigger_monthly_reports_if_needed():
@@ -20,9 +27,8 @@ def trigger_monthly_reports_if_needed():
     now = datetime.now(timezone.utc)
     
     # Check if it's the last day of the month (or first day of next month before 6 AM)
-    tomorrow = now + timedelta(days=1)
     is_end_of_month = (
-        tomorrow.day == 1 and 
+        now.day == calendar.monthrange(now.year, now.month)[1] and 
         now.hour >= 0 and 
         now.hour < 6
     )
@@ -37,25 +43,25 @@ def trigger_monthly_reports_if_needed():
 @celery_app.task
 def generate_monthly_reports_for_all_users():
     """Generate comprehensive monthly reports for all users"""
-    with session_scope() as session:
+    with readonly_scope() as connection:
         # Get all users with tracked videos
-        users = session.execute(
-            select(User).distinct().join(Video)
+        user_ids = connection.execute(
+            select(Video.user_id).distinct()
         ).scalars().all()
         
-        bot_logger.info(f"Generating monthly reports for {len(users)} users")
-        
-        for user in users:
-            try:
-                generate_user_monthly_report.delay(user.id)
-            except Exception as e:
-                bot_logger.error(f"Error queuing monthly report for user {user.id}: {e}")
-                continue
+    bot_logger.info(f"Generating monthly reports for {len(user_ids)} users")
+    
+    for user_id in user_ids:
+        try:
+            generate_user_monthly_report.delay(user_id)
+        except Exception as e:
+            bot_logger.error(f"Error queuing monthly report for user {user_id}: {e}")
+            continue
 
 
 @celery_app.task
-def generate_user_monthly_report(user_id: int):
-    """Generate comprehensive monthly report for a specific user"""
+def generate_user_monthly_report(user_id: int, year: Optional[int] = None, month: Optional[int] = None):
+    """Generate comprehensive monthly report for a specific user (defaults to the previous month)"""
     with session_scope() as session:
         user = session.execute(
             select(User).where(User.id == user_id)
@@ -65,9 +71,11 @@ def generate_user_monthly_report(user_id: int):
             bot_logger.error(f"User {user_id} not found")
             return
         
-        # Get the previous month
         now = datetime.now(timezone.utc)
-        if now.month == 1:
+        if year is not None and month is not None:
+            report_year, report_month = year, month
+        elif now.month == 1:
+            # Get the previous month
             report_month = 12
             report_year = now.year - 1
         else:
@@ -76,105 +84,17 @@ def generate_user_monthly_report(user_id: int):
         
         bot_logger.info(f"Generating monthly report for user {user.discord_username} - {report_month}/{report_year}")
         
-        # Get all user's videos
-        videos = session.execute(
-            select(Video).where(Video.user_id == user.id)
-        ).scalars().all()
+        if (report_year, report_month) != (now.year, now.month):
+            # Past months are closed: serve them from the stored aggregates instead of
+            # refetching live stats, which would also overwrite the historical rows
+            report_summary = _build_historical_report(session, user, report_year, report_month)
+        else:
+            report_summary = _build_live_report(session, user, report_year, report_month, now)
         
-        if not videos:
+        if report_summary is None:
             bot_logger.info(f"No videos found for user {user.discord_username}")
             return
         
-        # Fetch final stats for all videos
-        final_stats = []
-        total_views = 0
-        total_likes = 0
-        total_videos = len(videos)
-        
-        for video in videos:
-            try:
-                # Fetch final stats for the month
-                stats = fetch_video_stats(video.video_id)
-                if stats:
-                    # Update video with final stats
-                    video.last_view_count = stats.view_count
-                    video.last_updated_at = now
-                    
-                    # Update or create final monthly view record
-                    monthly_view = session.execute(
-                        select(MonthlyView).where(
-                            and_(
-                                MonthlyView.user_id == user.id,
-                                MonthlyView.video_id == video.id,
-                                MonthlyView.year == report_year,
-                                MonthlyView.month == report_month
-                            )
-                        )
-                    ).scalar_one_or_none()
-                    
-                    if monthly_view:
-                        # Calculate incremental view change since last update
-                        views_change = stats.view_count - video.last_view_count
-                        if views_change > 0:
-                            monthly_view.views += views_change  # Add only new views to monthly total
-                        monthly_view.updated_at = now
-                    else:
-                        # Create monthly view record starting from current baseline
-                        monthly_view = MonthlyView(
-                            user_id=user.id,
-                            video_id=video.id,
-                            year=report_year,
-                            month=report_month,
-                            views=0,  # Start at 0 - only track incremental views
-                            views_change=0,
-                            updated_at=now
-                        )
-                        session.add(monthly_view)
-                    
-                    final_stats.append({
-                        'video': video,
-                        'stats': stats,
-                        'monthly_views': monthly_view.views,
-                        'views_change': monthly_view.views_change
-                    })
-                    
-                    total_views += stats.view_count
-                    total_likes += stats.like_count
-                    
-            except Exception as e:
-                bot_logger.error(f"Error fetching final stats for video {video.video_id}: {e}")
-                continue
-        
-        # Commit all updates
-        session.commit()
-        
-        # Generate report summary
-        report_summary = {
-            'user_id': user.id,
-            'discord_user_id': user.discord_user_id,
-            'discord_username': user.discord_username,
-            'month': report_month,
-            'year': report_year,
-            'total_views': total_views,
-            'total_likes': total_likes,
-            'total_videos': total_videos,
-            'videos_with_stats': len(final_stats),
-            'top_performers': [],
-            'monthly_growth': 0
-        }
-        
-        # Calculate top performers
-        if final_stats:
-            top_performers = sorted(final_stats, key=lambda x: x['monthly_views'], reverse=True)[:5]
-            report_summary['top_performers'] = [
-                {
-                    'title': item['video'].title or f"Video {item['video'].video_id}",
-                    'views': item['monthly_views'],
-                    'change': item['views_change']
-                }
-                for item in top_performers
-            ]
-        
         # Calculate monthly growth (compare with previous month)
         if report_month == 1:
             prev_month = 12
@@ -193,10 +113,13 @@ def generate_user_monthly_report(user_id: int):
             )
         ).scalar() or 0
         
+        total_views = report_summary['total_views']
         if prev_month_total > 0:
             report_summary['monthly_growth'] = ((total_views - prev_month_total) / prev_month_total) * 100
         
-        bot_logger.info(f"Monthly report generated for {user.discord_username}: {total_views:,} views, {total_likes:,} likes")
+        total_likes = report_summary['total_likes']
+        likes_text = f"{total_likes:,} likes" if total_likes is not None else "likes not tracked"
+        bot_logger.info(f"Monthly report generated for {user.discord_username}: {total_views:,} views, {likes_text}")
         
         # Store report in database or send notification
         store_monthly_report.delay(report_summary)
@@ -204,17 +127,170 @@ def generate_user_monthly_report(user_id: int):
         return report_summary
 
 
+def _new_report_summary(user: User, report_year: int, report_month: int) -> Dict:
+    return {
+        'user_id': user.id,
+        'discord_user_id': user.discord_user_id,
+        'discord_username': user.discord_username,
+        'month': report_month,
+        'year': report_year,
+        'total_views': 0,
+        'total_likes': 0,
+        'total_videos': 0,
+        'videos_with_stats': 0,
+        'top_performers': [],
+        'monthly_growth': 0
+    }
+
+
+def _build_historical_report(session, user: User, report_year: int, report_month: int) -> Optional[Dict]:
+    """Build a report for a closed month from MonthlyView rows only, without any API calls"""
+    total_videos = session.execute(
+        select(func.count(Video.id)).where(Video.user_id == user.id)
+    ).scalar() or 0
+    if not total_videos:
+        return None
+    
+    period_filter = and_(
+        MonthlyView.user_id == user.id,
+        MonthlyView.year == report_year,
+        MonthlyView.month == report_month
+    )
+    
+    # Totals and top performers are aggregated and ranked by the database
+    total_views, videos_with_stats = session.execute(
+        select(func.coalesce(func.sum(MonthlyView.views), 0), func.count(MonthlyView.id)).where(period_filter)
+    ).one()
+    
+    top_rows = session.execute(
+        select(Video.display_title.label("title"), MonthlyView.views, MonthlyView.views_change)
+        .select_from(MonthlyView)
+        .join(Video, MonthlyView.video_id == Video.id)
+        .where(period_filter)
+        .order_by(MonthlyView.views.desc())
+        .limit(5)
+    ).all()
+    
+    report_summary = _new_report_summary(user, report_year, report_month)
+    report_summary['total_views'] = total_views
+    report_summary['total_videos'] = total_videos
+    report_summary['videos_with_stats'] = videos_with_stats
+    # Likes are not stored per month, so a closed month has no like total to report
+    report_summary['total_likes'] = None
+    report_summary['top_performers'] = [
+        {
+            'title': row.title,
+            'views': row.views,
+            'change': row.views_change
+        }
+        for row in top_rows
+    ]
+    
+    return report_summary
+
+
+def _build_live_report(session, user: User, report_year: int, report_month: int, now: datetime) -> Optional[Dict]:
+    """Build a report for the current month from freshly fetched video stats"""
+    # Get all user's videos
+    videos = session.execute(
+        select(Video).options(raiseload("*")).where(Video.user_id == user.id)
+    ).scalars().all()
+    
+    if not videos:
+        return None
+    
+    total_likes = 0
+    
+    # Fetch final stats for the month for all videos in batched API requests
+    stats_map = fetch_video_stats_batch([video.video_id for video in videos])
+    
+    video_updates = []
+    monthly_rows = []
+    fetched_videos = []
+    
+    for video in videos:
+        try:
+            stats = stats_map.get(video.video_id)
+            if stats:
+                # Calculate incremental view change before overwriting the baseline
+                views_change = stats.view_count - video.last_view_count
+                
+                # Update video with final stats
+                video_updates.append({"id": video.id, "last_view_count": stats.view_count, "last_updated_at": now})
+                
+                # New monthly records start at 0 - only track incremental views
+                monthly_rows.append({
+                    "user_id": user.id,
+                    "video_id": video.id,
+                    "year": report_year,
+                    "month": report_month,
+                    "views": 0,
+                    "views_change": views_change,
+                    "updated_at": now,
+                })
+                fetched_videos.append(video)
+                
+                total_likes += stats.like_count
+                
+        except Exception as e:
+            bot_logger.error(f"Error fetching final stats for video {video.video_id}: {e}")
+            continue
+    
+    # Write all video stat updates in one executemany UPDATE
+    if video_updates:
+        session.execute(update(Video), video_updates)
+    
+    # Update or create all final monthly view records in one statement
+    monthly_views = bulk_upsert_monthly_views(session, monthly_rows)
+    
+    # Keep monthly totals in arrays parallel to fetched_videos for the top-N selection
+    monthly_view_counts = [monthly_views[video.id][0] for video in fetched_videos]
+    monthly_view_changes = [monthly_views[video.id][1] for video in fetched_videos]
+    
+    # Commit all updates
+    session.commit()
+    
+    # Generate report summary
+    report_summary = _new_report_summary(user, report_year, report_month)
+    # Views gained this month, the same measure the historical path and monthly_growth use
+    report_summary['total_views'] = sum(monthly_view_counts)
+    report_summary['total_likes'] = total_likes
+    report_summary['total_videos'] = len(videos)
+    report_summary['videos_with_stats'] = len(fetched_videos)
+    
+    # Calculate top performers
+    if fetched_videos:
+        top_indices = heapq.nlargest(5, range(len(monthly_view_counts)), key=monthly_view_counts.__getitem__)
+        report_summary['top_performers'] = [
+            {
+                'title': fetched_videos[i].display_title,
+                'views': monthly_view_counts[i],
+                'change': monthly_view_changes[i]
+            }
+            for i in top_indices
+        ]
+    
+    return report_summary
+
+
 @celery_app.task
 def store_monthly_report(report_summary: Dict):
     """Store monthly report summary in database"""
     # This could store the report in a new table for historical tracking
     # For now, we'll just log it
-    bot_logger.info(f"Monthly report stored for user {report_summary['discord_username']}: {report_summary['total_views']:,} views")
+    total_likes = report_summary.get('total_likes')
+    likes_text = f", {total_likes:,} likes" if total_likes is not None else ""
+    bot_logger.info(f"Monthly report stored for user {report_summary['discord_username']}: {report_summary['total_views']:,} views{likes_text}")
 
 
 @celery_app.task
 def sync_new_videos_for_user(user_id: int):
     """Sync new videos from automatic channels for a specific user"""
+    # Skip if the same sync already ran for this user within the last minute
+    if not cache_acquire_lock(f"lock:sync_new_videos_for_user:{user_id}", USER_TASK_LOCK_TTL):
+        bot_logger.info(f"Skipping duplicate video sync for user {user_id}")
+        return {"synced": 0, "errors": 0, "skipped": True}
+    
     with session_scope() as session:
         user = session.execute(
             select(User).where(User.id == user_id)
@@ -226,7 +302,7 @@ def sync_new_videos_for_user(user_id: int):
         
         # Get user's automatic channels
         channels = session.execute(
-            select(Channel).where(
+            select(Channel).options(raiseload("*")).where(
                 and_(
                     Channel.user_id == user.id,
                     Channel.is_verified == True,
@@ -243,62 +319,65 @@ def sync_new_videos_for_user(user_id: int):
         synced_count = 0
         error_count = 0
         
+        # Fetch recent videos and their stats for all channels concurrently; DB writes stay serial below
+        channel_results = fetch_channel_videos_with_stats([c.channel_id for c in channels], max_results=10)
+        
+        now = datetime.now(timezone.utc)
+        
         for channel in channels:
             try:
-                # Fetch recent videos from channel
-                videos = fetch_channel_videos(channel.channel_id, max_results=10)
-                
-                for video_info in videos:
-                    # Check if video already exists
-                    existing_video = session.execute(
-                        select(Video).where(
-                            and_(
-                                Video.user_id == user.id,
-                                Video.video_id == video_info.video_id
-                            )
+                # Recent videos and their stats were fetched concurrently above
+                fetched = channel_results.get(channel.channel_id)
+                if fetched is None:
+                    raise RuntimeError("failed to fetch channel videos")
+                videos, stats_map = fetched
+
+                video_rows = [
+                    {
+                        "user_id": user.id,
+                        "channel_id": channel.id,
+                        "video_id": video_info.video_id,
+                        "url": f"https://www.youtube.com/watch?v={video_info.video_id}",
+                        "title": stats.title,
+                        "description": stats.description,
+                        "thumbnail_url": stats.thumbnail_url,
+                        "published_at": stats.published_at,
+                        "last_view_count": stats.view_count,
+                    }
+                    for video_info in videos
+                    if (stats := stats_map.get(video_info.video_id))
+                ]
+
+                if video_rows:
+                    # Existing videos are skipped by the unique constraints, no pre-check needed
+                    inserted_ids = session.execute(
+                        pg_insert(Video)
+                        .values(video_rows)
+                        .on_conflict_do_nothing()
+                        .returning(Video.id)
+                    ).scalars().all()
+
+                    if inserted_ids:
+                        # Create initial monthly view records (start at 0 - only track incremental views from this point)
+                        session.execute(
+                            pg_insert(MonthlyView)
+                            .values([
+                                {
+                                    "user_id": user.id,
+                                    "video_id": video_pk,
+                                    "year": now.year,
+                                    "month": now.month,
+                                    "views": 0,  # Start at 0 - only track views gained after adding to bot
+                                    "updated_at": now,
+                                }
+                                for video_pk in inserted_ids
+                            ])
+                            .on_conflict_do_nothing(index_elements=["video_id", "year", "month"])
                         )
-                    ).scalar_one_or_none()
-                    
-                    if existing_video:
-                        continue
-                    
-                    # Fetch detailed video stats
-                    stats = fetch_video_stats(video_info.video_id)
-                    if not stats:
-                        continue
-                    
-                    # Create video record
-                    video = Video(
-                        user_id=user.id,
-                        channel_id=channel.id,
-                        video_id=video_info.video_id,
-                        url=f"https://www.youtube.com/watch?v={video_info.video_id}",
-                        title=stats.title,
-                        description=stats.description,
-                        thumbnail_url=stats.thumbnail_url,
-                        published_at=stats.published_at,
-                        last_view_count=stats.view_count,
-                        created_at=datetime.now(timezone.utc),
-                    )
-                    session.add(video)
-                    session.flush()
-                    
-                    # Create initial monthly view record (start at 0 - only track incremental views from this point)
-                    now = datetime.now(timezone.utc)
-                    monthly_view = MonthlyView(
-                        user_id=user.id,
-                        video_id=video.id,
-                        year=now.year,
-                        month=now.month,
-                        views=0,  # Start at 0 - only track views gained after adding to bot
-                        updated_at=now
-                    )
-                    session.add(monthly_view)
-                    
-                    synced_count += 1
-                
+                        synced_count += len(inserted_ids)
+
                 # Update last sync time
-                channel.last_sync_at = datetime.now(timezone.utc)
+                channel.last_sync_at = now
                 
             except Exception as e:
                 bot_logger.error(f"Error syncing channel {channel.channel_id} for user {user.discord_username}: {e}")
@@ -316,19 +395,27 @@ def sync_new_videos_for_user(user_id: int):
 @celery_app.task
 def refresh_user_video_stats(user_id: int):
     """Refresh stats for all videos of a specific user"""
+    # Skip if the same refresh already ran for this user within the last minute
+    if not cache_acquire_lock(f"lock:refresh_user_video_stats:{user_id}", USER_TASK_LOCK_TTL):
+        bot_logger.info(f"Skipping duplicate stats refresh for user {user_id}")
+        return {"updated": 0, "errors": 0, "skipped": True}
+    
     with session_scope() as session:
+        # Load the user and all of their videos (one extra IN query), skipping unused video columns
         user = session.execute(
-            select(User).where(User.id == user_id)
+            select(User)
+            .options(
+                selectinload(User.videos).load_only(Video.id, Video.user_id, Video.video_id, Video.last_view_count, Video.last_updated_at).raiseload("*"),
+                raiseload("*")
+            )
+            .where(User.id == user_id)
         ).scalar_one_or_none()
         
         if not user:
             bot_logger.error(f"User {user_id} not found")
             return
         
-        # Get all user's videos
-        videos = session.execute(
-            select(Video).where(Video.user_id == user.id)
-        ).scalars().all()
+        videos = user.videos
         
         if not videos:
             bot_logger.info(f"No videos found for user {user.discord_username}")
@@ -337,48 +424,34 @@ def refresh_user_video_stats(user_id: int):
         updated_count = 0
         error_count = 0
         
+        # Fetch current stats for all videos in batched API requests
+        stats_map = fetch_video_stats_batch([video.video_id for video in videos])
+        now = datetime.now(timezone.utc)
+        video_updates = []
+        monthly_rows = []
+        
         for video in videos:
             try:
-                # Fetch current stats
-                stats = fetch_video_stats(video.video_id)
+                stats = stats_map.get(video.video_id)
                 if not stats:
                     continue
                 
-                # Update video record
-                video.last_view_count = stats.view_count
-                video.last_updated_at = datetime.now(timezone.utc)
+                # Calculate incremental view change before overwriting the baseline
+                views_change = stats.view_count - video.last_view_count
                 
-                # Update or create monthly view record
-                now = datetime.now(timezone.utc)
-                monthly_view = session.execute(
-                    select(MonthlyView).where(
-                        and_(
-                            MonthlyView.user_id == user.id,
-                            MonthlyView.video_id == video.id,
-                            MonthlyView.year == now.year,
-                            MonthlyView.month == now.month
-                        )
-                    )
-                ).scalar_one_or_none()
+                # Update video record
+                video_updates.append({"id": video.id, "last_view_count": stats.view_count, "last_updated_at": now})
                 
-                if monthly_view:
-                    # Calculate incremental view change since last update
-                    views_change = stats.view_count - video.last_view_count
-                    if views_change > 0:
-                        monthly_view.views += views_change  # Add only new views to monthly total
-                    monthly_view.updated_at = now
-                else:
-                    # Create new monthly view record starting from current baseline
-                    monthly_view = MonthlyView(
-                        user_id=user.id,
-                        video_id=video.id,
-                        year=now.year,
-                        month=now.month,
-                        views=0,  # Start at 0 - only track incremental views
-                        views_change=0,
-                        updated_at=now
-                    )
-                    session.add(monthly_view)
+                # New monthly records start at 0 - only track incremental views
+                monthly_rows.append({
+                    "user_id": user.id,
+                    "video_id": video.id,
+                    "year": now.year,
+                    "month": now.month,
+                    "views": 0,
+                    "views_change": views_change,
+                    "updated_at": now,
+                })
                 
                 updated_count += 1
                 
@@ -387,6 +460,13 @@ def refresh_user_video_stats(user_id: int):
                 error_count += 1
                 continue
         
+        # Write all video stat updates in one executemany UPDATE
+        if video_updates:
+            session.execute(update(Video), video_updates)
+        
+        # Update or create all monthly view records in one statement
+        bulk_upsert_monthly_views(session, monthly_rows)
+        
         session.commit()
         
         bot_logger.info(f"Updated {updated_count} videos for user {user.discord_username}")
@@ -3,11 +3,13 @@ from __future__ import annotations
 from datetime import datetime, timezone
 from typing import List
 
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import load_only, raiseload
 
-from app.infrastructure.db import session_scope
+from app.infrastructure.db import bulk_upsert_monthly_views, session_scope
 from app.models import User, Channel, Video, MonthlyView
-from app.services.youtube import fetch_video_stats, fetch_channel_videos
+from app.services.youtube import fetch_video_stats_batch, fetch_channel_videos_with_stats
 from app.tasks.celery_app import celery_app
 from app.utils.logger import bot_logger
 
@@ -16,56 +18,44 @@ from app.utils.logger import bot_logger
 def refresh_video_stats():
     """Refresh video statistics for all tracked videos"""
     with session_scope() as session:
-        # Get all active videos
+        # Get all active videos, loading only the columns the refresh reads or writes
         videos = session.execute(
-            select(Video).where(Video.is_active == True)
+            select(Video)
+            .options(load_only(Video.id, Video.user_id, Video.video_id, Video.last_view_count, Video.last_updated_at), raiseload("*"))
+            .where(Video.is_active == True)
         ).scalars().all()
         
         updated_count = 0
         error_count = 0
         
+        # Fetch current stats for all videos in batched API requests
+        stats_map = fetch_video_stats_batch([video.video_id for video in videos])
+        now = datetime.now(timezone.utc)
+        video_updates = []
+        monthly_rows = []
+        
         for video in videos:
             try:
-                # Fetch current stats
-                stats = fetch_video_stats(video.video_id)
+                stats = stats_map.get(video.video_id)
                 if not stats:
                     continue
                 
-                # Update video record
-                video.last_view_count = stats.view_count
-                video.last_updated_at = datetime.now(timezone.utc)
+                # Calculate incremental view change before overwriting the baseline
+                views_change = stats.view_count - video.last_view_count
                 
-                # Update or create monthly view record
-                now = datetime.now(timezone.utc)
-                monthly_view = session.execute(
-                    select(MonthlyView).where(
-                        and_(
-                            MonthlyView.video_id == video.id,
-                            MonthlyView.year == now.year,
-                            MonthlyView.month == now.month
-                        )
-                    )
-                ).scalar_one_or_none()
+                # Update video record
+                video_updates.append({"id": video.id, "last_view_count": stats.view_count, "last_updated_at": now})
                 
-                if monthly_view:
-                    # Calculate incremental view change since last update
-                    views_change = stats.view_count - video.last_view_count
-                    if views_change > 0:
-                        monthly_view.views += views_change  # Add only new views to monthly total
-                    monthly_view.updated_at = now
-                else:
-                    # Create new monthly view record starting from current baseline
-                    # Only track views gained after this point
-                    monthly_view = MonthlyView(
-                        user_id=video.user_id,
-                        video_id=video.id,
-                        year=now.year,
-                        month=now.month,
-                        views=0,  # Start at 0 - only track incremental views
-                        views_change=0,
-                        updated_at=now
-                    )
-                    session.add(monthly_view)
+                # New monthly records start at 0 - only track incremental views
+                monthly_rows.append({
+                    "user_id": video.user_id,
+                    "video_id": video.id,
+                    "year": now.year,
+                    "month": now.month,
+                    "views": 0,
+                    "views_change": views_change,
+                    "updated_at": now,
+                })
                 
                 updated_count += 1
                 
@@ -74,6 +64,13 @@ def refresh_video_stats():
                 error_count += 1
                 continue
         
+        # Write all video stat updates in one executemany UPDATE
+        if video_updates:
+            session.execute(update(Video), video_updates)
+        
+        # Update or create all monthly view records in one statement
+        bulk_upsert_monthly_views(session, monthly_rows)
+        
         bot_logger.info(f"Updated {updated_count} videos, {error_count} errors")
         return {"updated": updated_count, "errors": error_count}
 
@@ -84,7 +81,7 @@ def sync_automatic_channels():
     with session_scope() as session:
         # Get all verified automatic channels
         channels = session.execute(
-            select(Channel).where(
+            select(Channel).options(raiseload("*")).where(
                 and_(
                     Channel.is_verified == True,
                     Channel.verification_mode == "automatic",
@@ -96,60 +93,64 @@ def sync_automatic_channels():
         synced_count = 0
         error_count = 0
         
+        # Fetch recent videos and their stats for all channels concurrently; DB writes stay serial below
+        channel_results = fetch_channel_videos_with_stats([c.channel_id for c in channels], max_results=20)
+        
+        now = datetime.now(timezone.utc)
+        
         for channel in channels:
             try:
-                # Fetch recent videos from channel
-                videos = fetch_channel_videos(channel.channel_id, max_results=20)
-                
-                for video_info in videos:
-                    # Check if video already exists
-                    existing_video = session.execute(
-                        select(Video).where(
-                            and_(
-                                Video.user_id == channel.user_id,
-                                Video.video_id == video_info.video_id
-                            )
+                # Recent videos and their stats were fetched concurrently above
+                fetched = channel_results.get(channel.channel_id)
+                if fetched is None:
+                    raise RuntimeError("failed to fetch channel videos")
+                videos, stats_map = fetched
+
+                video_rows = [
+                    {
+                        "user_id": channel.user_id,
+                        "channel_id": channel.id,
+                        "video_id": video_info.video_id,
+                        "url": f"https://www.youtube.com/watch?v={video_info.video_id}",
+                        "title": stats.title,
+                        "description": stats.description,
+                        "thumbnail_url": stats.thumbnail_url,
+                        "published_at": stats.published_at,
+                        "last_view_count": stats.view_count,
+                    }
+                    for video_info in videos
+                    if (stats := stats_map.get(video_info.video_id))
+                ]
+
+                if video_rows:
+                    # Existing videos are skipped by the unique constraints, no pre-check needed
+                    inserted_ids = session.execute(
+                        pg_insert(Video)
+                        .values(video_rows)
+                        .on_conflict_do_nothing()
+                        .returning(Video.id)
+                    ).scalars().all()
+
+                    if inserted_ids:
+                        # Create initial monthly view records
+                        session.execute(
+                            pg_insert(MonthlyView)
+                            .values([
+                                {
+                                    "user_id": channel.user_id,
+                                    "video_id": video_pk,
+                                    "year": now.year,
+                                    "month": now.month,
+                                    "views": 0,  # Start at 0 - only track views gained after adding to bot
+                                    "updated_at": now,
+                                }
+                                for video_pk in inserted_ids
+                            ])
+                            .on_conflict_do_nothing(index_elements=["video_id", "year", "month"])
                         )
-                    ).scalar_one_or_none()
-                    
-                    if existing_video:
-                        continue
-                    
-                    # Fetch detailed video stats
-                    stats = fetch_video_stats(video_info.video_id)
-                    if not stats:
-                        continue
-                    
-                    # Create video record
-                    video = Video(
-                        user_id=channel.user_id,
-                        channel_id=channel.id,
-                        video_id=video_info.video_id,
-                        url=f"https://www.youtube.com/watch?v={video_info.video_id}",
-                        title=stats.title,
-                        description=stats.description,
-                        thumbnail_url=stats.thumbnail_url,
-                        published_at=stats.published_at,
-                        last_view_count=stats.view_count,
-                        created_at=datetime.now(timezone.utc),
-                    )
-                    session.add(video)
-                    session.flush()
-                    
-                    # Create initial monthly view record
-                    now = datetime.now(timezone.utc)
-                    monthly_view = MonthlyView(
-                        user_id=channel.user_id,
-                        video_id=video.id,
-                        year=now.year,
-                        month=now.month,
-                        views=0,  # Start at 0 - only track views gained after adding to bot
-                        updated_at=now
-                    )
-                    session.add(monthly_view)
-                
+
                 # Update last sync time
-                channel.last_sync_at = datetime.now(timezone.utc)
+                channel.last_sync_at = now
                 synced_count += 1
                 
             except Exception as e:
@@ -7,10 +7,15 @@ import logging.handlers
 import sys
 from pathlib import Path
 from typing import Optional
-import json
 from datetime import datetime
 
-from app.config import settings
+import msgspec
+
+from app.config import get_settings
+
+
+# Shared C encoder for structured log lines; values JSON can't represent fall back to str()
+_json_encoder = msgspec.json.Encoder(enc_hook=str)
 
 
 class StructuredFormatter(logging.Formatter):
@@ -33,7 +38,7 @@ class StructuredFormatter(logging.Formatter):
         if record.exc_info:
             log_entry["exception"] = self.formatException(record.exc_info)
         
-        return json.dumps(log_entry)
+        return _json_encoder.encode(log_entry).decode()
 
 
 def setup_logging():
@@ -43,10 +48,10 @@ def setup_logging():
     logs_dir.mkdir(exist_ok=True)
     
     # Get log level from settings
-    log_level = getattr(logging, settings.log_level.upper(), logging.INFO)
+    log_level = getattr(logging, get_settings().log_level.upper(), logging.INFO)
     
     # Create formatters
-    if settings.is_production():
+    if get_settings().is_production():
         # Structured JSON logging for production
         formatter = StructuredFormatter()
     else:
@@ -5,7 +5,7 @@ Basic tests for DataBot core functionality.
 import pytest
 from unittest.mock import Mock, patch
 
-from app.config import settings
+from app.config import get_settings
 from app.models import User, Channel, Video
 from app.infrastructure.db import init_db, session_scope
 
@@ -15,9 +15,21 @@ class TestConfiguration:
     
     def test_settings_loaded(self):
         """Test that settings are properly loaded."""
+        settings = get_settings()
         assert hasattr(settings, 'discord_bot_token')
         assert hasattr(settings, 'database_url')
         assert hasattr(settings, 'youtube_api_key')
+    
+    def test_cache_clear_rereads_environment(self):
+        """get_settings.cache_clear() picks up a changed environment."""
+        get_settings.cache_clear()
+        try:
+            with patch.dict("os.environ", {"CACHE_TTL": "123"}):
+                assert get_settings().cache_ttl == 123
+                get_settings.cache_clear()
+            assert get_settings().cache_ttl != 123
+        finally:
+            get_settings.cache_clear()
 
 
 class TestModels:
@@ -26,10 +38,10 @@ class TestModels:
     def test_user_model(self):
         """Test User model creation."""
         user = User(
-            discord_user_id="123456789",
+            discord_user_id=123456789,
             discord_username="testuser"
         )
-        assert user.discord_user_id == "123456789"
+        assert user.discord_user_id == 123456789
         assert user.discord_username == "testuser"
     
     def test_channel_model(self):
@@ -74,3 +86,248 @@ class TestDatabase:
         init_db()
         mock_wait_for_db.assert_called_once()
         mock_create_all.assert_called_once()
+    
+    def test_partition_skipped_when_table_not_partitioned(self):
+        """A plain (pre-partitioning) monthly_views table gets no partition DDL."""
+        from app.infrastructure.db import ensure_monthly_views_partition
+        
+        mock_connection = Mock()
+        mock_connection.execute.return_value.scalar.return_value = False
+        
+        assert ensure_monthly_views_partition(mock_connection, 2025, 12) is False
+        mock_connection.execute.assert_called_once()
+    
+    def test_partition_created_with_month_rollover(self):
+        """December's partition ends at January of the next year."""
+        from app.infrastructure.db import ensure_monthly_views_partition
+        
+        mock_connection = Mock()
+        mock_connection.execute.return_value.scalar.return_value = True
+        
+        assert ensure_monthly_views_partition(mock_connection, 2025, 12) is True
+        ddl = str(mock_connection.execute.call_args_list[-1].args[0])
+        assert "monthly_views_2025_12" in ddl
+        assert "FROM (2025, 12) TO (2026, 1)" in ddl
+    
+    def test_bulk_upsert_monthly_views_statement(self):
+        """Conflicting rows add only the positive views_change to the stored total."""
+        from sqlalchemy.dialects import postgresql
+        from app.infrastructure.db import bulk_upsert_monthly_views
+        
+        mock_session = Mock()
+        mock_session.execute.return_value = iter([(7, 10, 3)])
+        rows = [{
+            "user_id": 1, "video_id": 7, "year": 2025, "month": 5,
+            "views": 0, "views_change": 3, "updated_at": None,
+        }]
+        
+        assert bulk_upsert_monthly_views(mock_session, rows) == {7: (10, 3)}
+        stmt = mock_session.execute.call_args.args[0]
+        sql = str(stmt.compile(dialect=postgresql.dialect()))
+        assert "ON CONFLICT (video_id, year, month) DO UPDATE" in sql
+        assert "views = (monthly_views.views + greatest(excluded.views_change," in sql
+        assert "views_change = excluded.views_change" in sql
+        assert "RETURNING monthly_views.video_id, monthly_views.views, monthly_views.views_change" in sql
+
+
+class TestRedisReconnect:
+    """Test recovery from the Redis stand-in client."""
+    
+    def test_null_client_retries_after_interval(self):
+        """get_redis() replaces a stale _NullRedis with a real client once Redis is back."""
+        from app.infrastructure import cache
+        
+        stale = cache._NullRedis()
+        stale.failed_at -= cache.REDIS_RECONNECT_INTERVAL + 1
+        real_client = Mock()
+        with patch.object(cache, "_redis_client", stale), \
+                patch("app.infrastructure.cache.redis.BlockingConnectionPool.from_url"), \
+                patch("app.infrastructure.cache.redis.Redis", return_value=real_client):
+            assert cache.get_redis() is real_client
+            real_client.ping.assert_called_once()
+    
+    def test_null_client_kept_within_interval(self):
+        """get_redis() does not hammer Redis while the outage is recent."""
+        from app.infrastructure import cache
+        
+        fresh = cache._NullRedis()
+        with patch.object(cache, "_redis_client", fresh), \
+                patch("app.infrastructure.cache.redis.BlockingConnectionPool.from_url") as mock_from_url:
+            assert cache.get_redis() is fresh
+            mock_from_url.assert_not_called()
+
+
+class TestCachePacking:
+    """Test the tagged msgpack/LZ4 cache value format."""
+    
+    def test_small_value_round_trip(self):
+        """Values under the threshold are stored raw behind the raw tag."""
+        from app.infrastructure import cache
+        
+        value = {"channel_id": "UC123", "views": 42}
+        packed = cache._pack(value)
+        assert packed[:1] == cache._RAW_TAG
+        assert cache._unpack(packed, cache._decoder) == value
+    
+    def test_large_value_round_trip(self):
+        """Values over the threshold are LZ4-compressed and decode back unchanged."""
+        from app.infrastructure import cache
+        
+        value = {"description": "x" * (cache.COMPRESSION_THRESHOLD_BYTES * 4)}
+        packed = cache._pack(value)
+        assert packed[:1] == cache._LZ4_TAG
+        assert len(packed) < cache.COMPRESSION_THRESHOLD_BYTES
+        assert cache._unpack(packed, cache._decoder) == value
+    
+    def test_legacy_untagged_value(self):
+        """Entries written before tagging was added still decode as plain msgpack."""
+        import msgspec
+        from app.infrastructure import cache
+        
+        value = {"channel_id": "UC123"}
+        legacy = msgspec.msgpack.encode(value)
+        assert cache._unpack(legacy, cache._decoder) == value
+    
+    def test_corrupt_frame_is_dropped(self):
+        """A corrupt LZ4 frame is treated as a miss and deleted from the cache."""
+        from app.infrastructure import cache
+        
+        mock_client = Mock()
+        mock_client.get.return_value = cache._LZ4_TAG + b"not an lz4 frame"
+        with patch.object(cache, "get_redis", return_value=mock_client):
+            assert cache._cache_get("corrupt", cache._decoder) is None
+        mock_client.delete.assert_called_once_with("corrupt")
+
+
+def _run_lua_script(source, keys, args, store):
+    """Run a Redis Lua script against an in-memory hash store (requires lupa)."""
+    lupa = pytest.importorskip("lupa")
+    lua = lupa.LuaRuntime()
+    
+    def call(command, key, *values):
+        command = command.upper()
+        hash_ = store.setdefault(key, {})
+        if command == "HMGET":
+            return lua.table(*[hash_.get(field, False) for field in values])
+        if command == "HSET":
+            hash_.update({values[i]: str(values[i + 1]) for i in range(0, len(values), 2)})
+        return 1
+    
+    run = lua.eval("function(call, keys, argv) redis = {call = call}; KEYS = keys; ARGV = argv; " + source + " end")
+    result = run(call, lua.table(*keys), lua.table(*[str(arg) for arg in args]))
+    return list(result.values())
+
+
+class TestRateBuckets:
+    """Test the shared per-minute/per-second token buckets."""
+    
+    def _bucket_manager(self, store):
+        from app.services import quota_manager
+        
+        manager = quota_manager.QuotaManager()
+        runner = lambda source, keys, args: _run_lua_script(source, keys, args, store)
+        return manager, patch.object(quota_manager, "cache_run_script", side_effect=runner)
+    
+    def test_burst_admitted_then_denied(self):
+        """The per-second bucket admits a full burst and denies the next request."""
+        store = {}
+        manager, script_patch = self._bucket_manager(store)
+        with script_patch:
+            for _ in range(manager.limits.REQUESTS_PER_SECOND):
+                assert manager._check_rate_buckets(1000.0, take=True)[0] is True
+            allowed, _, second_tokens = manager._check_rate_buckets(1000.0, take=True)
+        assert allowed is False
+        assert second_tokens == 0
+    
+    def test_check_without_take_spends_nothing(self):
+        """A plain availability check leaves both buckets full."""
+        store = {}
+        manager, script_patch = self._bucket_manager(store)
+        with script_patch:
+            allowed, minute_tokens, second_tokens = manager._check_rate_buckets(1000.0, take=False)
+        assert allowed is True
+        assert minute_tokens == manager.limits.REQUESTS_PER_MINUTE
+        assert second_tokens == manager.limits.REQUESTS_PER_SECOND
+    
+    def test_buckets_refill_over_time(self):
+        """Tokens come back at the configured rate, capped at the bucket size."""
+        store = {}
+        manager, script_patch = self._bucket_manager(store)
+        with script_patch:
+            for _ in range(manager.limits.REQUESTS_PER_SECOND):
+                manager._check_rate_buckets(1000.0, take=True)
+            _, _, second_tokens = manager._check_rate_buckets(1000.2, take=False)
+            assert second_tokens == pytest.approx(0.2 * manager.limits.REQUESTS_PER_SECOND)
+            allowed, minute_tokens, second_tokens = manager._check_rate_buckets(1060.0, take=False)
+        assert allowed is True
+        assert minute_tokens == manager.limits.REQUESTS_PER_MINUTE
+        assert second_tokens == manager.limits.REQUESTS_PER_SECOND
+    
+    def test_requests_over_burst_wait_instead_of_failing(self):
+        """Concurrent requests beyond the burst size wait for tokens and all go through."""
+        import asyncio
+        from app.services import quota_manager
+        
+        store = {}
+        clock = [1000.0]
+        real_sleep = asyncio.sleep
+        
+        async def fake_sleep(delay):
+            clock[0] += delay
+            await real_sleep(0)
+        
+        manager, script_patch = self._bucket_manager(store)
+        
+        async def run_requests():
+            return await asyncio.gather(*[
+                manager.wait_if_needed(quota_manager.QuotaType.VIDEO_STATS)
+                for _ in range(manager.limits.REQUESTS_PER_SECOND * 4)
+            ])
+        
+        with script_patch, \
+                patch.object(quota_manager, "cache_get_counters", return_value=[0, 0]), \
+                patch.object(quota_manager.time, "time", side_effect=lambda: clock[0]), \
+                patch.object(quota_manager.asyncio, "sleep", side_effect=fake_sleep):
+            results = asyncio.run(run_requests())
+        
+        assert all(results)
+        assert clock[0] > 1000.0
+    
+    def test_exhausted_daily_quota_is_rejected_without_waiting(self):
+        """A used-up daily quota is not waited out."""
+        import asyncio
+        from app.services import quota_manager
+        
+        manager = quota_manager.QuotaManager()
+        with patch.object(quota_manager, "cache_get_counters", return_value=[manager.limits.DAILY_QUOTA_LIMIT, 0]), \
+                patch.object(quota_manager, "cache_run_script") as mock_script, \
+                patch.object(quota_manager.asyncio, "sleep") as mock_sleep:
+            assert asyncio.run(manager.wait_if_needed(quota_manager.QuotaType.VIDEO_STATS)) is False
+        mock_script.assert_not_called()
+        mock_sleep.assert_not_called()
+    
+    def test_fails_open_without_redis(self):
+        """With no script result every request is allowed at full bucket levels."""
+        from app.services import quota_manager
+        
+        manager = quota_manager.QuotaManager()
+        with patch.object(quota_manager, "cache_run_script", return_value=None):
+            allowed, minute_tokens, second_tokens = manager._check_rate_buckets(1000.0, take=True)
+        assert allowed is True
+        assert minute_tokens == manager.limits.REQUESTS_PER_MINUTE
+        assert second_tokens == manager.limits.REQUESTS_PER_SECOND
+    
+    def test_required_delay_follows_token_levels(self):
+        """get_required_delay waits for the emptier bucket to hold a whole token."""
+        import asyncio
+        from app.services import quota_manager
+        
+        manager = quota_manager.QuotaManager()
+        with patch.object(quota_manager, "cache_run_script", return_value=[0, "150", "0.5"]):
+            assert manager._check_rate_buckets(1000.0, take=True)[0] is False
+        delay = asyncio.run(manager.get_required_delay())
+        assert delay == pytest.approx(0.5 / manager.limits.REQUESTS_PER_SECOND)
+        
+        with patch.object(quota_manager, "cache_run_script", return_value=[1, "150", "3"]):
+            manager._check_rate_buckets(1000.0, take=True)
+        assert asyncio.run(manager.get_required_delay()) == 0